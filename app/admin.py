@@ -1,22 +1,64 @@
+import hashlib
 import streamlit as st
 import pandas as pd
-import json
 from mongo_storage import (
-    get_users, delete_user,
-    save_topic, get_all_topics, delete_topic, validate_questions,
+    get_all_topics, get_pending_imports,
+    get_topic_cache_stats, get_item_stats, get_item_stats_status,
+    get_recent_jobs, get_job, retry_job,
     create_user, update_user
 )
+from result_writer import get_result_writer
+from jobs import enqueue, enqueue_upload
+from auth import get_user_doc
+from user_pager import paged_users
+from image_store import get_image_cache_stats
+from db import get_pool_stats
+from instrumentation import phase
 import streamlit_authenticator_mongo as stauth
 
+STATUS_ICONS = {"queued": "⏳", "running": "⚙️", "done": "✅", "failed": "❌"}
+
+def _file_digest(uploaded_file):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: uploaded_file.read(1 << 20), b""):
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+def render_jobs():
+    st.subheader("🗂️ Background Jobs")
+    jobs = get_recent_jobs()
+    if not jobs:
+        st.info("No jobs yet.")
+        return
+    for job in jobs:
+        progress = job.get("progress") or {}
+        label = f"{STATUS_ICONS.get(job['status'], '')} {job['kind']} — {job['job_id'][:8]} (attempt {job['attempts']}/{job['max_attempts']})"
+        st.markdown(label)
+        if job["status"] == "running":
+            done, total = progress.get("done", 0), progress.get("total", 0)
+            if total:
+                st.progress(min(1.0, done / total), text=f"{progress.get('message', '')}: {done} / {total}")
+            else:
+                st.caption(f"{progress.get('message', '')}: {done}")
+        elif job["status"] == "done":
+            st.caption(f"Result: {job.get('result')}")
+        elif job.get("error"):
+            st.caption(f"Last error: {job['error']}")
+        if job["status"] == "failed" and "upload_id" in job.get("params", {}):
+            st.caption("Its upload was removed; upload the file again to retry.")
+        elif job["status"] == "failed" and st.button("Retry", key=f"retry_{job['job_id']}"):
+            retry_job(job["job_id"])
+
 def show_admin_panel():
     st.title("🛠️ Admin Panel")
 
-    tab1, tab2, tab3, tab4 = st.tabs(["Users", "Topics", "Analytics", "Manage Users"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Users", "Topics", "Analytics", "Manage Users", "Jobs"])
 
     # 👥 User Management
-    with tab1:
+    with tab1, phase("admin_users"):
         st.subheader("👥 View & Delete Users")
-        users = get_users()
+        users = paged_users("admin_users")
         if users:
             st.dataframe(pd.DataFrame(users), width='stretch')
         else:
@@ -26,34 +68,37 @@ def show_admin_panel():
         with col1:
             delete_u = st.text_input("Delete user by email")
         with col2:
-            if st.button("Delete User"):
-                if delete_user(delete_u):
-                    st.success(f"User '{delete_u}' deleted.")
+            if st.button("Delete User") and delete_u:
+                user = get_user_doc(delete_u.strip())
+                if user is None:
+                    st.error(f"No user with email '{delete_u}'.")
                 else:
-                    st.warning("User not found.")
+                    # Results, rollups and attempts go too, so this runs off the request path
+                    email = user["email"]
+                    enqueue("delete_user", {"email": email}, idempotency_key=f"delete_user:{email}")
+                    st.success(f"Deletion of '{email}' and their results queued; see the Jobs tab.")
 
     # 📤 Topic Upload
-    with tab2:
+    with tab2, phase("admin_topics"):
         st.subheader("📤 Upload Question Set (Topic)")
         uploaded_file = st.file_uploader("Upload JSON file of questions", type="json")
         topic_name = st.text_input("Topic unique name (e.g., Physics 101 - Midterm)")
+        st.caption("Uploading under an existing name adds a new revision; quizzes already running keep theirs.")
 
         if uploaded_file and topic_name and st.button("Save Topic"):
-            try:
-                questions = json.load(uploaded_file)
-                issues = validate_questions(questions)
-                if issues:
-                    st.error("Validation failed:")
-                    for issue in issues:
-                        st.markdown(f"- {issue}")
-                else:
-                    for q in questions:
-                        q.setdefault("category", "Uncategorized")
-                        q.setdefault("difficulty", "Unknown")
-                    topic_id = save_topic(topic_name, questions)
-                    st.success(f"✅ Topic '{topic_name}' saved with ID: {topic_id}")
-            except Exception as e:
-                st.exception(e)
+            # The same file and name map to the same job, so a double click queues it once
+            key = f"import_topic:{topic_name}:{_file_digest(uploaded_file)}"
+            job_id = enqueue_upload("import_topic", {"topic_name": topic_name}, uploaded_file.name, uploaded_file, key)
+            st.success(f"📥 Import of '{topic_name}' queued as job {job_id[:8]}; see the Jobs tab for progress and validation issues.")
+
+        pending = get_pending_imports()
+        if pending:
+            st.subheader("⏸️ Incomplete Imports")
+            for t in pending:
+                st.warning(f"{t['topic_name']} (revision {t['version'][:12]}): {t.get('imported', 0)} questions written. Retry its job or re-upload to resume.")
+                if st.button("Discard", key=f"discard_{t['version']}"):
+                    enqueue("discard_import", {"version": t["version"]}, idempotency_key=f"discard_import:{t['version']}")
+                    st.info("Discard queued.")
 
         st.subheader("📚 Existing Topics")
         topics = get_all_topics()
@@ -61,15 +106,13 @@ def show_admin_panel():
             st.info("No topics found.")
         else:
             for t in topics:
-                with st.expander(f"{t['topic_name']} — {t['topic_id']}"):
+                with st.expander(f"{t['topic_name']} — {t['topic_id']} (revision {t['version'][:12]})"):
                     if st.button("Delete", key=f"del_{t['topic_id']}"):
-                        if delete_topic(t["topic_id"]):
-                            st.success("Deleted")
-                        else:
-                            st.error("Delete failed")
+                        enqueue("delete_topic", {"topic_id": t["topic_id"]}, idempotency_key=f"delete_topic:{t['topic_id']}")
+                        st.info("Delete queued.")
 
     # 📊 Topic Analytics
-    with tab3:
+    with tab3, phase("admin_analytics"):
         st.subheader("📊 Topic Overview")
         topics = get_all_topics()
         df = pd.DataFrame(topics)
@@ -78,8 +121,40 @@ def show_admin_panel():
         else:
             st.dataframe(df, width='stretch')
 
+            st.subheader("🧪 Item Analysis")
+            names = {t["topic_name"]: t["topic_id"] for t in topics}
+            topic_id = names[st.selectbox("Topic", list(names), key="item_stats_topic")]
+            status = get_item_stats_status(topic_id)
+            version = status.get("version")
+            if version:
+                st.caption(f"Snapshot of revision {version[:12]} covers attempts finished before {status['watermark']} (refreshed {status['refreshed_at']})")
+            else:
+                st.caption("No snapshot yet.")
+            if st.button("🔄 Refresh item statistics"):
+                enqueue("item_stats", {"topic_id": topic_id}, idempotency_key=f"item_stats:{topic_id}")
+                st.info("Refresh queued; see the Jobs tab.")
+            items = get_item_stats(topic_id, version) if version else []
+            if items:
+                items_df = pd.DataFrame(items)
+                items_df["distractor_rates"] = items_df["distractor_rates"].map(
+                    lambda rates: ", ".join(f"{k}: {v:.0%}" for k, v in sorted(rates.items()))
+                )
+                st.dataframe(
+                    items_df[["question_id", "n", "difficulty", "discrimination", "mean_seconds", "distractor_rates"]]
+                    .sort_values("question_id", key=lambda col: col.astype(str)),
+                    width='stretch',
+                )
+            else:
+                st.info("No item statistics yet for this topic.")
+
+        stats = get_topic_cache_stats()
+        st.caption(f"Topic catalog cache: {stats['hits']} hits / {stats['misses']} misses (version {stats['version']})")
+        st.caption(f"Result writer: {get_result_writer().metrics()}")
+        st.caption(f"Image cache: {get_image_cache_stats()}")
+        st.caption(f"Mongo pool: {get_pool_stats()}")
+
     # 🧑‍💼 Manage Users
-    with tab4:
+    with tab4, phase("admin_manage_users"):
         st.subheader("🧑‍💼 Create New User")
         new_email = st.text_input("Email")
         new_name = st.text_input("Full Name")
@@ -97,6 +172,27 @@ def show_admin_panel():
                 else:
                     st.error("User already exists or creation failed.")
 
+        st.subheader("📥 Bulk Provision Users")
+        st.caption("CSV with an email,name,password,role header, or a JSON list of objects with those keys.")
+        users_file = st.file_uploader("Upload users", type=["csv", "json"], key="bulk_users")
+        if users_file and st.button("Provision Users"):
+            key = f"provision_users:{_file_digest(users_file)}"
+            st.session_state.provision_job = enqueue_upload(
+                "provision_users", {"filename": users_file.name}, users_file.name, users_file, key
+            )
+            st.success("📥 Provisioning queued; see the Jobs tab for progress.")
+
+        job_id = st.session_state.get("provision_job")
+        job = get_job(job_id) if job_id else None
+        if job and job["status"] == "done":
+            result = job["result"]
+            st.write(f"Created {result.get('created', 0)}, duplicates {result.get('duplicate', 0)}, "
+                     f"invalid {result.get('invalid', 0)}, errors {result.get('error', 0)}")
+            if result["report"]:
+                report = pd.DataFrame(result["report"])
+                st.dataframe(report, width='stretch')
+                st.download_button("⬇️ Download report (CSV)", report.to_csv(index=False), file_name="provisioning_report.csv", mime="text/csv")
+
         st.subheader("✏️ Update Existing User")
         update_email = st.text_input("User Email to Update")
         update_name = st.text_input("New Name (optional)")
@@ -117,3 +213,7 @@ def show_admin_panel():
                 st.success(f"User '{update_email}' updated.")
             else:
                 st.error("User not found or update failed.")
+
+    # 🗂️ Jobs
+    with tab5, phase("admin_jobs"):
+        st.fragment(render_jobs, run_every=3)()
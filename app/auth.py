@@ -1,41 +1,90 @@
+import threading
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+
 import streamlit_authenticator_mongo as stauth
 import yaml
 from yaml.loader import SafeLoader
-from pymongo import MongoClient
-from config import mongo_config
+from config import cache_config
+from db import get_db
+from mongo_storage import get_user_credentials, get_version, on_change
 
-def get_authenticator():
-    cfg = mongo_config()
-    client = MongoClient(cfg["uri"])
-    db = client[cfg["db_name"]]
-    users_collection = db["users"]
 
-    # Load cookie config
+class CredentialStore:
+    """Process-wide, read-only usernames map shared by every Streamlit session.
+
+    Keys are lowercased once at build time, as the login form lowercases the
+    typed email. Rebuilt only after a local user write or when the ``users`` version
+    stamp in Mongo moves (checked at most every ``check_interval`` seconds).
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._usernames: Optional[Mapping[str, Dict[str, Any]]] = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._usernames = None
+
+    def get(self) -> Mapping[str, Dict[str, Any]]:
+        with self._lock:
+            now = time.monotonic()
+            if self._usernames is not None and now - self._checked_at < self.check_interval:
+                return self._usernames
+            version = get_version("users")
+            if self._usernames is None or version != self._version:
+                users = {email.lower(): user for email, user in get_user_credentials().items()}
+                self._usernames = MappingProxyType(users)
+                self._version = version
+            self._checked_at = now
+            return self._usernames
+
+
+_store = CredentialStore(cache_config()["users_version_check_seconds"])
+on_change("users", _store.invalidate)
+
+
+@lru_cache(maxsize=1)
+def _load_cookie_config() -> Dict[str, Any]:
     with open("auth_config.yaml") as file:
-        config = yaml.load(file, Loader=SafeLoader)
-
-    # Build credentials dict using email as key
-    credentials = {"usernames": {}}
-    for user in users_collection.find():
-        if not all(k in user for k in ("email", "password", "name")):
-            print(f"⚠️ Skipping invalid user document: {user}")
-            continue
-
-        credentials["usernames"][user["email"]] = {
-            "email": user["email"],
-            "name": user["name"],
-            "password": user["password"],
-            "role": user.get("role", "user")
-        }
-
-    authenticator = stauth.Authenticate(
-        credentials,
+        return yaml.load(file, Loader=SafeLoader)
+
+
+def cookie_signing_key() -> str:
+    return _load_cookie_config()["cookie"]["key"]
+
+
+def get_user_doc(email: str) -> Optional[Dict[str, Any]]:
+    return _store.get().get(email.lower())
+
+
+class _SharedAuthenticate(stauth.Authenticate):
+    """Authenticate against the ``users`` collection of the shared client.
+
+    The library checks a login with ``collection.find_one`` on the typed
+    (lowercased) email, so it needs the real collection; this hands it the
+    pooled one instead of a new ``MongoClient`` per rerun. The shared
+    ``CredentialStore`` only serves ``get_user_doc``.
+    """
+
+    def __init__(self, *args):
+        super().__init__(get_db()["users"], *args)
+
+
+def get_authenticator():
+    config = _load_cookie_config()
+
+    # The Authenticate widget holds per-session cookie state, so it is cheap
+    # to rebuild each rerun; it looks users up only when the form is submitted.
+    authenticator = _SharedAuthenticate(
         config["cookie"]["name"],
         config["cookie"]["key"],
         config["cookie"]["expiry_days"],
         config.get("preauthorized", {})
     )
-
-    # Attach raw Mongo collection for later lookups
-    authenticator.collection = users_collection
     return authenticator
@@ -0,0 +1,82 @@
+"""Mongo round trips and latency spent on auth per Streamlit rerun.
+
+Run from app/:  python -m benchmarks.auth_rerun [--reruns 200]
+"""
+import argparse
+import statistics
+import time
+
+import yaml
+from yaml.loader import SafeLoader
+from pymongo import MongoClient, monitoring
+from config import mongo_config
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+counter = CommandCounter()
+monitoring.register(counter)
+
+
+def legacy_rerun(email):
+    # Mirrors the pre-cache get_authenticator() + main.py user lookup.
+    cfg = mongo_config()
+    client = MongoClient(cfg["uri"])
+    users_collection = client[cfg["db_name"]]["users"]
+    with open("auth_config.yaml") as file:
+        yaml.load(file, Loader=SafeLoader)
+    credentials = {"usernames": {}}
+    for user in users_collection.find():
+        if all(k in user for k in ("email", "password", "name")):
+            credentials["usernames"][user["email"]] = user
+    users_collection.find_one({"email": email})
+    client.close()
+
+
+def cached_rerun(email):
+    from auth import _load_cookie_config, _store, get_user_doc
+    _load_cookie_config()
+    _store.get()
+    get_user_doc(email)
+
+
+def measure(label, fn, email, reruns):
+    timings = []
+    start_count = counter.count
+    for _ in range(reruns):
+        t0 = time.perf_counter()
+        fn(email)
+        timings.append((time.perf_counter() - t0) * 1000)
+    commands = (counter.count - start_count) / reruns
+    timings.sort()
+    print(
+        f"{label:>8}: {commands:.2f} Mongo commands/rerun, "
+        f"p50 {statistics.median(timings):.2f} ms, "
+        f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reruns", type=int, default=200)
+    parser.add_argument("--email", default="admin@example.com")
+    args = parser.parse_args()
+
+    measure("legacy", legacy_rerun, args.email, args.reruns)
+    measure("cached", cached_rerun, args.email, args.reruns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Drive N simulated quiz takers through main.py with Streamlit's AppTest.
+
+Each user logs in, opens the Quiz page, picks the load-test topic, starts a
+quiz, answers every question and lands on the results page. The report is
+written as JSON so a later run can be diffed against it.
+
+Each question is shown for --think-seconds of simulated time. In autorefresh
+mode every simulated second is a full rerun, as st_autorefresh would trigger.
+In fragment mode those ticks rerun only the countdown fragment in the browser,
+which AppTest does not fire, so they add no full reruns; their cost is the
+quiz_timer phase. Rerun rates come from the app's own quiz_reruns counter.
+
+AppTest swaps process-wide globals (the Runtime instance, config options) on
+every run, so runs from different users are serialized: sessions interleave
+and share the process caches, but the latencies are those of one run at a
+time, not of runs contending for the CPU.
+
+Run from app/:
+    python -m benchmarks.load_test --users 50 --questions 20 --output load_baseline.json
+    python -m benchmarks.load_test --mongo memory            # needs mongomock
+    python -m benchmarks.load_test --timer-mode both --think-seconds 10
+    python -m benchmarks.load_test --compare load_baseline.json   # writes load_report.json
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import monitoring
+
+from benchmarks.session_state import deep_size
+
+PASSWORD = "loadtest"
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+TOPIC_NAME = "Load Test Topic"
+_run_lock = threading.Lock()
+
+
+class OpCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+ops = OpCounter()
+monitoring.register(ops)
+
+
+def use_memory_mongo():
+    import mongomock
+    import db
+
+    client = mongomock.MongoClient()
+    db.get_client = lambda: client
+
+
+def seed(users, questions):
+    import streamlit_authenticator_mongo as stauth
+    from mongo_storage import create_user, delete_topic, get_all_topics, save_topic
+
+    hashed = stauth.Hasher([PASSWORD]).generate()[0]
+    for i in range(users):
+        create_user(f"loadtest-{i}@example.com", f"Load Tester {i}", hashed, "user")
+    for t in get_all_topics():
+        if t["topic_name"] == TOPIC_NAME:
+            delete_topic(t["topic_id"])
+    save_topic(TOPIC_NAME, [
+        {
+            "id": n,
+            "text": f"Load test question {n}",
+            "options": {"A": "first", "B": "second", "C": "third", "D": "fourth"},
+            "correct": ["B"],
+            "type": "single",
+            "points": 1,
+            "category": "Load",
+            "difficulty": "Easy",
+        }
+        for n in range(1, questions + 1)
+    ])
+
+
+def _widget(elements, label):
+    return next(w for w in elements if w.label == label)
+
+
+def _button(at, label):
+    return _widget(list(at.button) + list(at.sidebar.button), label)
+
+
+def session_state_size(at):
+    """Deep size of one session's own state; the shared question cache isn't counted."""
+    return deep_size(at.session_state.to_dict())
+
+
+def simulate_user(i, questions, timings, timer_mode, think_seconds):
+    from streamlit.testing.v1 import AppTest
+
+    def timed_run(kind, action):
+        with _run_lock:
+            started = time.perf_counter()
+            action.run()
+            timings[kind].append(time.perf_counter() - started)
+        timings["reruns"].append(1)
+
+    at = AppTest.from_file(MAIN_SCRIPT, default_timeout=60)
+    timed_run("page_load", at)
+
+    _widget(at.text_input, "Email").input(f"loadtest-{i}@example.com")
+    _widget(at.text_input, "Password").input(PASSWORD)
+    timed_run("page_load", _button(at, "Login").click())
+
+    timed_run("page_load", _widget(at.sidebar.radio, "Go to").set_value("Quiz"))
+    timed_run("page_load", _widget(at.sidebar.selectbox, "Topic").set_value(TOPIC_NAME))
+    _widget(at.sidebar.number_input, "Number of questions").set_value(questions)
+    timed_run("page_load", _button(at, "Start Quiz").click())
+
+    for _ in range(questions):
+        if not at.radio:
+            break
+        if timer_mode == "autorefresh":
+            for _ in range(think_seconds):
+                timed_run("timer_tick", at)
+        at.radio[0].set_value(at.radio[0].options[0])
+        timed_run("submit", _button(at, "Submit Answer").click())
+    if at.exception:
+        raise RuntimeError(f"loadtest-{i}: {at.exception[0].message}")
+    return at
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(p):
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "mean_ms": round(statistics.mean(ordered) * 1000, 2)}
+
+
+def phase_totals(name):
+    """``(count, seconds)`` observed so far for one rerun phase."""
+    from instrumentation import phase_seconds
+
+    series = phase_seconds._series.get((name,)) or [0.0]
+    return sum(series[:-1]), series[-1]
+
+
+def run_mode(args, timer_mode):
+    from instrumentation import quiz_reruns
+
+    os.environ["QUIZ_TIMER_MODE"] = timer_mode
+    timings = {"page_load": [], "submit": [], "timer_tick": [], "reruns": []}
+    full_before = quiz_reruns.value((timer_mode, "full"))
+    ticks_before = quiz_reruns.value((timer_mode, "timer_tick"))
+    timer_before = phase_totals("quiz_timer")
+    ops_before = ops.count
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency or args.users) as pool:
+        sessions = list(pool.map(
+            lambda i: simulate_user(i, args.questions, timings, timer_mode, args.think_seconds),
+            range(args.users),
+        ))
+    elapsed = time.perf_counter() - started
+    state_sizes = [session_state_size(at) for at in sessions]
+
+    user_minutes = args.users * elapsed / 60
+    # Simulated time the quizzes were open, not the harness's wall time
+    quiz_minutes = args.users * args.questions * args.think_seconds / 60
+    full = quiz_reruns.value((timer_mode, "full")) - full_before
+    ticks = quiz_reruns.value((timer_mode, "timer_tick")) - ticks_before
+    timer_count, timer_seconds = (a - b for a, b in zip(phase_totals("quiz_timer"), timer_before))
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "reruns": len(timings["reruns"]),
+        "reruns_per_s": round(len(timings["reruns"]) / elapsed, 2),
+        "page_load": percentiles(timings["page_load"]),
+        "submit": percentiles(timings["submit"]),
+        "timer_tick": percentiles(timings["timer_tick"]),
+        "full_reruns_per_quiz_minute": round(full / quiz_minutes, 1) if quiz_minutes else None,
+        "timer_ticks_per_quiz_minute": round(ticks / quiz_minutes, 1) if quiz_minutes else None,
+        "quiz_timer_phase_mean_ms": round(timer_seconds / timer_count * 1000, 3) if timer_count else None,
+        # Command listeners don't fire against mongomock
+        "mongo_ops_per_user_minute": round((ops.count - ops_before) / user_minutes, 1) if args.mongo == "local" else None,
+        "session_state_kb": round(statistics.mean(state_sizes) / 1024, 1),
+    }
+
+
+def run_load(args):
+    if args.mongo == "memory":
+        use_memory_mongo()
+    seed(args.users, args.questions)
+
+    modes = ["fragment", "autorefresh"] if args.timer_mode == "both" else [args.timer_mode]
+    report = {"config": vars(args)}
+    for timer_mode in modes:
+        report[timer_mode] = run_mode(args, timer_mode)
+    return report
+
+
+def compare(baseline_path, report):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"Compared with {baseline_path}:")
+    for mode in ("fragment", "autorefresh"):
+        if mode not in report:
+            continue
+        before, after = baseline.get(mode, {}), report[mode]
+        for key in ("reruns_per_s", "full_reruns_per_quiz_minute", "timer_ticks_per_quiz_minute",
+                    "mongo_ops_per_user_minute", "session_state_kb"):
+            print(f"  {mode}.{key}: {before.get(key)} -> {after.get(key)}")
+        for kind in ("page_load", "submit", "timer_tick"):
+            for p, value in after[kind].items():
+                print(f"  {mode}.{kind}.{p}: {before.get(kind, {}).get(p)} -> {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=0, help="Threads driving users (default: one per user)")
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--mongo", choices=["local", "memory"], default="local")
+    parser.add_argument("--timer-mode", choices=["fragment", "autorefresh", "both"], default="fragment")
+    parser.add_argument("--think-seconds", type=int, default=5, help="Simulated seconds each question stays on screen")
+    parser.add_argument("--output", default="load_report.json")
+    parser.add_argument("--compare", default=None, help="Baseline JSON to diff against")
+    args = parser.parse_args()
+
+    report = run_load(args)
+    print(json.dumps(report, indent=2, default=str))
+    if args.compare:
+        compare(args.compare, report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
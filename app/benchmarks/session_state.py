@@ -0,0 +1,93 @@
+"""Per-session quiz state size before and after the shared question cache,
+and of the record save_progress keeps of the last saved state.
+
+Run from app/:  python -m benchmarks.session_state [--questions 500]
+"""
+import argparse
+import pickle
+import random
+import sys
+from array import array
+
+from question_cache import Question
+from quiz_state import PERSISTED, fingerprint, snapshot
+
+
+def deep_size(obj, seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(v, seen) for v in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_size(getattr(obj, a), seen) for a in obj.__slots__ if hasattr(obj, a))
+    return size
+
+
+def synthetic_question(i):
+    return {
+        "id": i,
+        "text": f"Question {i}: " + "lorem ipsum dolor sit amet " * 8,
+        "options": {k: f"Option {k} for question {i}, " + "consectetur " * 4 for k in "ABCD"},
+        "correct": ["B"],
+        "type": "single",
+        "points": 1,
+        "image": f"https://example.com/images/{i}.png",
+        "category": "Networking",
+        "difficulty": "Medium",
+    }
+
+
+def legacy_state(questions):
+    shuffled_options, key_maps, answers = {}, {}, []
+    for q in questions:
+        items = list(q["options"].items())
+        random.shuffle(items)
+        shuffled_options[q["id"]] = {chr(65 + i): v for i, (_, v) in enumerate(items)}
+        key_maps[q["id"]] = {chr(65 + i): k for i, (k, _) in enumerate(items)}
+        answers.append({"question_id": q["id"], "user": ["A"], "correct": q["correct"]})
+    return {
+        "quiz_questions": [dict(q) for q in questions],
+        "shuffled_options": shuffled_options,
+        "key_maps": key_maps,
+        "answers": answers,
+    }
+
+
+def compact_state(ordinals):
+    return {
+        "quiz_topic_id": "00000000-0000-0000-0000-000000000000",
+        "quiz_ordinals": array("I", ordinals),
+        "option_perms": {i: bytes(random.sample(range(4), 4)) for i in range(len(ordinals))},
+        "answers": [(i, ("A",), 0) for i in range(len(ordinals))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=500)
+    args = parser.parse_args()
+
+    docs = [synthetic_question(i) for i in range(1, args.questions + 1)]
+    shared = {i: Question(i, d) for i, d in enumerate(docs, start=1)}
+    before = legacy_state(docs)
+    after = compact_state(list(shared))
+
+    print(f"{args.questions}-question quiz, one session:")
+    print(f"  legacy  deep size {deep_size(before):>10,} B   pickled {len(pickle.dumps(before)):>10,} B")
+    print(f"  compact deep size {deep_size(after):>10,} B   pickled {len(pickle.dumps(after)):>10,} B")
+    print(f"  shared Question cache (once per process per topic): {deep_size(shared):,} B")
+
+    # What save_progress keeps of the last saved state, to diff the next one against
+    session = {k: None for k in PERSISTED}
+    session.update(after, quiz_version=after["quiz_topic_id"], index=args.questions, score=0)
+    saved = snapshot(session)
+    print(f"  last saved state: full copy {deep_size(saved):>10,} B   fingerprint {deep_size(fingerprint(saved)):>6,} B")
+
+
+if __name__ == "__main__":
+    main()
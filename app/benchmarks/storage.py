@@ -0,0 +1,177 @@
+"""Storage-layer benchmarks on production-sized synthetic data.
+
+Seeds users, results, rollups, attempts and a large topic, times every
+public mongo_storage entry point plus the quiz's pure-Python hot spots, and
+checks the explain() plan of each indexed query. A query that falls back
+to a collection scan fails the run (exit code 1).
+
+Point it at a scratch database; seeding is destructive:
+    cd app && MONGO_DB=quizapp_bench python -m benchmarks.storage --scale 0.01
+    MONGO_DB=quizapp_bench python -m benchmarks.storage --skip-seed
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import db
+import mongo_storage as ms
+from question_cache import get_question_cache
+from review import build_review
+
+BATCH = 10_000
+TOPIC_NAME = "Benchmark Topic"
+
+
+def question(n):
+    return {
+        "id": n,
+        "text": f"Benchmark question {n}",
+        "options": {"A": "alpha", "B": "bravo", "C": "charlie", "D": "delta"},
+        "correct": ["B"],
+        "type": "single",
+        "points": 1,
+        "category": random.choice(["Networking", "Security", "Storage"]),
+        "difficulty": random.choice(["Easy", "Medium", "Hard"]),
+    }
+
+
+def seed(database, users, results, questions):
+    print(f"🌱 Seeding {users:,} users, {results:,} results, {questions:,} questions…")
+    for name in ("users", "results", "daily_rollups", "attempts", "topics", "topic_versions",
+                 "questions", "item_stats", "quiz_sessions", "meta"):
+        database[name].drop()
+    ms._db = None
+    ms._get_db()  # recreate indexes on the empty collections
+
+    for start in range(0, users, BATCH):
+        database.users.insert_many([
+            {"email": f"user{i:07d}@example.com", "name": f"User {i}", "password": "x", "role": "user"}
+            for i in range(start, min(users, start + BATCH))
+        ], ordered=False)
+
+    topic_id = ms.save_topic(TOPIC_NAME, [question(n) for n in range(1, questions + 1)])
+
+    now = datetime.utcnow()
+    for start in range(0, results, BATCH):
+        batch = []
+        for _ in range(min(BATCH, results - start)):
+            score = random.choice([0, 1])
+            batch.append({
+                "email": f"user{random.randrange(users):07d}@example.com",
+                "question_id": random.randrange(1, questions + 1),
+                "user_answers": ["B"] if score else ["A"],
+                "correct_answers": ["B"],
+                "score": score,
+                "timestamp": now - timedelta(minutes=random.randrange(365 * 24 * 60)),
+                "topic_id": topic_id,
+                "attempt_id": None,
+            })
+        database.results.insert_many(batch, ordered=False)
+    ms.rebuild_daily_rollups()
+    return topic_id
+
+
+def bench(name, fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"  {name:<44} median {statistics.median(timings):>10.2f} ms   max {max(timings):>10.2f} ms")
+
+
+def plan_stages(plan):
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+
+def check_plan(name, explain):
+    planner = explain.get("queryPlanner") or explain.get("stages", [{}])[0].get("$cursor", {}).get("queryPlanner", {})
+    stages = plan_stages(planner.get("winningPlan", {}))
+    ok = "COLLSCAN" not in stages
+    print(f"  {'✅' if ok else '❌'} {name:<42} {' <- '.join(s for s in stages if s)}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier on the production-sized defaults")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--results", type=int, default=50_000_000)
+    parser.add_argument("--questions", type=int, default=50_000)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    users = max(1, int(args.users * args.scale))
+    results = max(1, int(args.results * args.scale))
+    questions = max(1, int(args.questions * args.scale))
+    database = db.get_db()
+
+    if args.skip_seed:
+        topic_id = next(t["topic_id"] for t in ms.get_all_topics() if t["topic_name"] == TOPIC_NAME)
+    else:
+        topic_id = seed(database, users, results, questions)
+
+    version = next(t["version"] for t in ms.get_all_topics() if t["topic_id"] == topic_id)
+    email = f"user{random.randrange(users):07d}@example.com"
+    since = datetime.utcnow() - timedelta(days=30)
+    bank = [question(n) for n in range(1, questions + 1)]
+
+    print("⏱️ Storage API")
+    bench("find_users (page of 25, prefix 'user00')", lambda: ms.find_users("user00"))
+    bench("get_user_results (all)", lambda: ms.get_user_results(email))
+    bench("get_user_results (30 days, last 20)", lambda: ms.get_user_results(email, since=since, limit=20))
+    bench("get_daily_rollups (30 days)", lambda: ms.get_daily_rollups(email, since=since))
+    bench("get_user_attempts (last 10)", lambda: ms.get_user_attempts(email))
+    bench("save_result_mongo", lambda: ms.save_result_mongo(email, 1, ["B"], ["B"], 1, topic_id))
+    bench("get_all_topics (cached)", ms.get_all_topics)
+    bench("get_all_topics (cold)", lambda: (ms._catalog.invalidate(), ms.get_all_topics()))
+    bench("get_questions_by_ordinals (whole topic)", lambda: ms.get_questions_by_ordinals(version, list(range(1, questions + 1))), repeat=3)
+    bench("select_topic_ordinals (50 random)", lambda: ms.select_topic_ordinals(version, 1, questions, 50))
+    bench("select_topic_ordinals (50 in order)", lambda: ms.select_topic_ordinals(version, 1, questions, 50, False))
+    bench("select_topic_ordinals (50, Networking, 50% Hard)", lambda: ms.select_topic_ordinals(
+        version, 1, questions, 50, categories=["Networking"], difficulty_mix={"Hard": 0.5}))
+    bench("get_topic_facets (cold)", lambda: (ms._facets.clear(), ms.get_topic_facets(version)))
+    bench("save_topic (100 questions)", lambda: ms.delete_topic(ms.save_topic(f"Bench {uuid.uuid4()}", bank[:100])), repeat=3)
+    bench("validate_questions (whole bank)", lambda: ms.validate_questions(bank), repeat=3)
+
+    print("⏱️ QuizApp hot spots")
+    from quiz import QuizApp
+    app = QuizApp.__new__(QuizApp)
+    bench("shuffle_options x 1000", lambda: [app.shuffle_options(4) for _ in range(1000)])
+    quiz = get_question_cache().get_many(version, range(1, min(questions, 1000) + 1))
+    answers = [(i, ("A",), 0) for i in range(len(quiz))]
+    perms = {i: bytes(random.sample(range(4), 4)) for i in range(len(quiz))}
+    bench(f"build_review ({len(quiz)} answers)", lambda: build_review(quiz, answers, perms, 0))
+    review = build_review(quiz, answers, perms, 0)
+    bench("review export csv", lambda: review.export("csv"))
+
+    print("🔎 Index usage")
+    day = since.strftime("%Y-%m-%d")
+    checks = [
+        ("results by email + time range", database.results.find({"email": email, "timestamp": {"$gte": since}}).sort("timestamp", -1).limit(20).explain()),
+        ("users by email cursor", database.users.find({"email": {"$gt": "user00"}}).sort("email", 1).limit(26).explain()),
+        ("users by name prefix", database.users.find({"name": {"$regex": "^User 1"}}).limit(26).explain()),
+        ("attempts by email", database.attempts.find({"email": email}).sort("started_at", -1).limit(10).explain()),
+        ("daily rollups by email + day", database.daily_rollups.find({"email": email, "day": {"$gte": day}}).explain()),
+        ("questions by topic + ordinal", database.questions.find({"topic_id": version, "ordinal": {"$gte": 1, "$lte": 50}}).explain()),
+        ("questions by topic + category + difficulty", database.questions.find({"topic_id": version, "category": {"$in": ["Networking"]}, "difficulty": "Hard", "ordinal": {"$gte": 1, "$lte": questions}}).explain()),
+        ("topic by id", database.topics.find({"topic_id": topic_id}).explain()),
+    ]
+    if not all([check_plan(name, plan) for name, plan in checks]):
+        print("❌ At least one query is not using an index")
+        sys.exit(1)
+    print("✅ All checked queries use an index")
+
+
+if __name__ == "__main__":
+    main()
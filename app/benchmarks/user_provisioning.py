@@ -0,0 +1,68 @@
+"""Bulk user provisioning throughput, in users per second.
+
+Times bcrypt hashing serially and across a process pool. Unless
+--hash-only is given, it then runs the full provision_users path against
+Mongo, inserting and then removing bench-*@example.com accounts.
+
+Run from app/:
+    python -m benchmarks.user_provisioning --users 500 --processes 8
+    python -m benchmarks.user_provisioning --users 200 --hash-only
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from user_import import hash_passwords, provision_users
+
+
+def rate(label, count, seconds):
+    print(f"  {label:<36} {count:>6} users in {seconds:>7.2f} s   {count / seconds:>8.1f} users/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--hash-only", action="store_true", help="Skip the Mongo insert pass")
+    args = parser.parse_args()
+
+    passwords = [f"password-{i}" for i in range(args.users)]
+    print(f"⏱️ bcrypt hashing ({os.cpu_count()} CPU(s) available)")
+    started = time.perf_counter()
+    hash_passwords(passwords)
+    rate("serial", args.users, time.perf_counter() - started)
+
+    # Same start method as provision_users, so start-up cost matches
+    with ProcessPoolExecutor(max_workers=args.processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+        hash_passwords(passwords[:args.processes], pool)  # start the workers outside the timing
+        started = time.perf_counter()
+        hash_passwords(passwords, pool)
+        rate(f"process pool x{args.processes}", args.users, time.perf_counter() - started)
+
+    if args.hash_only:
+        return
+
+    from mongo_storage import _get_db
+
+    rows = [
+        {"email": f"bench-{i}@example.com", "name": f"Bench {i}", "password": pw, "role": "user"}
+        for i, pw in enumerate(passwords)
+    ]
+    db = _get_db()
+    db.users.delete_many({"email": {"$regex": "^bench-"}})
+    print("⏱️ provision_users (hash + unordered insert_many)")
+    started = time.perf_counter()
+    report = provision_users(rows, processes=args.processes)
+    rate("first run", args.users, time.perf_counter() - started)
+    started = time.perf_counter()
+    again = provision_users(rows, processes=args.processes)
+    rate("same file again (all duplicates)", args.users, time.perf_counter() - started)
+    print(f"  created {sum(r['status'] == 'created' for r in report)}, "
+          f"duplicates on rerun {sum(r['status'] == 'duplicate' for r in again)}")
+    db.users.delete_many({"email": {"$regex": "^bench-"}})
+
+
+if __name__ == "__main__":
+    main()
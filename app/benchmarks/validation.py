@@ -0,0 +1,93 @@
+"""Question-bank validation throughput on synthetic banks.
+
+The "pickle chunks" row is what a process pool would pay in the parent just
+to ship the bank to workers, before any checking. It is serial, so no core
+count brings a pooled run under it.
+
+Run from app/:  python -m benchmarks.validation [--sizes 10000 100000 1000000]
+"""
+import argparse
+import pickle
+import random
+import time
+
+from validation import ValidationEngine
+
+
+def synthetic_bank(n, error_rate=0.0):
+    bank = []
+    for i in range(1, n + 1):
+        q = {
+            "id": i,
+            "text": f"Question {i}?",
+            "options": {"A": "alpha", "B": "bravo", "C": "charlie", "D": "delta"},
+            "correct": ["B"],
+            "type": "single",
+            "points": 1,
+            "category": "Networking",
+            "difficulty": "Easy",
+        }
+        if error_rate and random.random() < error_rate:
+            q["correct"] = ["E"]
+        bank.append(q)
+    return bank
+
+
+def legacy_validate(questions):
+    # The original per-question loop from mongo_storage, for comparison
+    issues = []
+    for i, q in enumerate(questions, start=1):
+        if not isinstance(q, dict):
+            issues.append(f"Q{i}: must be an object.")
+            continue
+        for field in ["id", "text", "options", "correct", "type", "points"]:
+            if field not in q:
+                issues.append(f"Q{i}: missing '{field}'.")
+        if "options" in q and not isinstance(q["options"], dict):
+            issues.append(f"Q{i}: 'options' must be an object.")
+        if "correct" in q and not isinstance(q["correct"], list):
+            issues.append(f"Q{i}: 'correct' must be a list of labels.")
+        if "image" in q and q["image"] and not isinstance(q["image"], str):
+            issues.append(f"Q{i}: 'image' must be a string URL if present.")
+        if "category" in q and q["category"] and not isinstance(q["category"], str):
+            issues.append(f"Q{i}: 'category' must be a string if present.")
+        if "difficulty" in q and q["difficulty"] and not isinstance(q["difficulty"], str):
+            issues.append(f"Q{i}: 'difficulty' must be a string if present.")
+    return issues
+
+
+def pickle_chunks(bank, chunk_size=50_000):
+    for start in range(0, len(bank), chunk_size):
+        pickle.dumps(bank[start:start + chunk_size], protocol=pickle.HIGHEST_PROTOCOL)
+    return []
+
+
+def timed(fn, bank):
+    t0 = time.perf_counter()
+    issues = fn(bank)
+    return time.perf_counter() - t0, len(issues)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--error-rate", type=float, default=0.001)
+    args = parser.parse_args()
+
+    random.seed(42)
+    print(f"{'size':>9} {'variant':>16} {'seconds':>8} {'q/s':>11} {'issues':>7}")
+    for n in args.sizes:
+        bank = synthetic_bank(n, args.error_rate)
+        variants = {
+            "legacy": legacy_validate,
+            "engine": ValidationEngine(max_issues=None).validate,
+            "engine cap=100": ValidationEngine(max_issues=100).validate,
+            "pickle chunks": pickle_chunks,
+        }
+        for name, fn in variants.items():
+            seconds, issues = timed(fn, bank)
+            print(f"{n:>9} {name:>16} {seconds:>8.3f} {n / seconds:>11,.0f} {issues:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,81 @@ def get_config():
         "file_path": os.getenv("DEFAULT_QUESTION_FILE", "questions.json"),
         "duration_minutes": int(os.getenv("DEFAULT_DURATION_MINUTES", 5)),
         "num_questions": int(os.getenv("DEFAULT_NUM_QUESTIONS", 5)),
+        # "fragment" refreshes only the countdown; "autorefresh" reruns the whole script every second
+        # (25 vs 85 full reruns per quiz minute in benchmarks/load_report.json)
+        "timer_mode": os.getenv("QUIZ_TIMER_MODE", "fragment"),
     }
 
 def mongo_config():
     return {
         "uri": os.getenv("MONGO_URI", "mongodb://localhost:27017"),
         "db_name": os.getenv("MONGO_DB", "quizapp"),
+        "max_pool_size": int(os.getenv("MONGO_MAX_POOL_SIZE", 100)),
+        "min_pool_size": int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+        "max_idle_time_ms": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000)),
+        "wait_queue_timeout_ms": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000)),
+        "connect_timeout_ms": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000)),
+        "socket_timeout_ms": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 20000)),
+        "server_selection_timeout_ms": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+        "retry_writes": os.getenv("MONGO_RETRY_WRITES", "true").lower() == "true",
+        # Comma-separated, e.g. "zstd,zlib"; empty disables wire compression
+        "compressors": os.getenv("MONGO_COMPRESSORS", ""),
+        "write_concern": os.getenv("MONGO_WRITE_CONCERN", "majority"),
+    }
+
+def cache_config():
+    return {
+        "users_version_check_seconds": float(os.getenv("USERS_VERSION_CHECK_SECONDS", 5)),
+        "topic_catalog_ttl_seconds": float(os.getenv("TOPIC_CATALOG_TTL_SECONDS", 300)),
+        "topics_version_check_seconds": float(os.getenv("TOPICS_VERSION_CHECK_SECONDS", 2)),
+        "question_cache_questions": int(os.getenv("QUESTION_CACHE_QUESTIONS", 20000)),
+        "facet_cache_versions": int(os.getenv("FACET_CACHE_VERSIONS", 256)),
+    }
+
+def writer_config():
+    return {
+        "batch_size": int(os.getenv("RESULT_BATCH_SIZE", 50)),
+        "flush_seconds": float(os.getenv("RESULT_FLUSH_SECONDS", 1.0)),
+        # Each process appends its pid, e.g. results.spool.4242.jsonl
+        "spool_path": os.getenv("RESULT_SPOOL_PATH", "results.spool.jsonl"),
+        "max_row_failures": int(os.getenv("RESULT_MAX_ROW_FAILURES", 3)),
+        "max_replay_backoff": float(os.getenv("RESULT_MAX_REPLAY_BACKOFF_SECONDS", 60)),
+    }
+
+def image_config():
+    return {
+        "cache_mb": int(os.getenv("IMAGE_CACHE_MB", 64)),
+        "display_width": int(os.getenv("IMAGE_DISPLAY_WIDTH", 800)),
+        "fetch_timeout": float(os.getenv("IMAGE_FETCH_TIMEOUT", 10)),
+        "max_bytes": int(float(os.getenv("IMAGE_MAX_MB", 10)) * 1024 * 1024),
+        # Question banks may name files relative to this directory; unset allows URLs only
+        "local_dir": os.getenv("IMAGE_LOCAL_DIR", ""),
+    }
+
+def metrics_config():
+    return {
+        "file_path": os.getenv("METRICS_FILE", "metrics.prom"),
+        "export_seconds": float(os.getenv("METRICS_EXPORT_SECONDS", 15)),
+        "slow_query_ms": float(os.getenv("SLOW_QUERY_MS", 100)),
+    }
+
+def job_config():
+    return {
+        "processes": int(os.getenv("JOB_WORKER_PROCESSES", 2)),
+        "poll_seconds": float(os.getenv("JOB_POLL_SECONDS", 1.0)),
+        "lease_seconds": float(os.getenv("JOB_LEASE_SECONDS", 120)),
+        "max_attempts": int(os.getenv("JOB_MAX_ATTEMPTS", 3)),
+        "retry_seconds": float(os.getenv("JOB_RETRY_SECONDS", 10)),
+    }
+
+def session_config():
+    return {
+        "backend": os.getenv("QUIZ_SESSION_BACKEND", "mongo"),
+    }
+
+def exam_config():
+    return {
+        # Falls back to the auth cookie key when unset
+        "signing_secret": os.getenv("EXAM_SIGNING_SECRET"),
+        "grace_seconds": float(os.getenv("EXAM_GRACE_SECONDS", 15)),
     }
@@ -1,11 +1,15 @@
 import streamlit as st
 import pandas as pd
-from mongo_storage import get_users, get_user_results
+from datetime import date, datetime, time, timedelta
+from user_pager import paged_users
+from instrumentation import phase
+from mongo_storage import get_user_results, get_user_attempts, get_daily_rollups
 
 def show_dashboard():
     st.title("📊 Quiz Performance Dashboard")
 
-    users = [u["email"] for u in get_users()]
+    with phase("dashboard_users"):
+        users = [u["email"] for u in paged_users("dashboard_users")]
     if not users:
         st.warning("No users found.")
         return
@@ -14,15 +18,24 @@ def show_dashboard():
     if not selected_email:
         return
 
-    results = get_user_results(selected_email)
-    if not results:
-        st.info("No results found for this user.")
+    today = date.today()
+    window = st.date_input("Date range", (today - timedelta(days=29), today))
+    if not isinstance(window, (tuple, list)) or len(window) != 2:
+        st.info("Pick a start and end date.")
         return
+    since = datetime.combine(window[0], time.min)
+    until = datetime.combine(window[1] + timedelta(days=1), time.min)
 
-    df = pd.DataFrame(results)
+    with phase("dashboard_rollups"):
+        rollups = get_daily_rollups(selected_email, since=since, until=until)
+    if not rollups:
+        st.info("No results found for this user in the selected range.")
+        return
+
+    daily = pd.DataFrame(rollups)
     st.subheader(f"📋 Summary for {selected_email}")
-    total_questions = len(df)
-    avg_score = df["score"].mean() if total_questions > 0 else 0
+    total_questions = int(daily["answered"].sum())
+    avg_score = daily["score"].sum() / total_questions if total_questions > 0 else 0
 
     col1, col2 = st.columns(2)
     with col1:
@@ -31,13 +44,24 @@ def show_dashboard():
         st.metric("Average Score", f"{avg_score:.2f}")
 
     st.subheader("📈 Score Over Time")
-    trend = df[["timestamp", "score"]].copy()
-    trend["timestamp"] = pd.to_datetime(trend["timestamp"])
-    trend = trend.set_index("timestamp").resample("D").sum()
+    trend = daily.groupby("day")["score"].sum()
+    trend.index = pd.to_datetime(trend.index)
+    trend = trend.reindex(pd.date_range(since, until - timedelta(days=1), freq="D"), fill_value=0).to_frame("score")
     st.line_chart(trend)
 
+    with phase("dashboard_attempts"):
+        attempts = get_user_attempts(selected_email, limit=10)
+    if attempts:
+        st.subheader("🗂️ Recent Attempts")
+        st.dataframe(
+            pd.DataFrame(attempts)[["started_at", "topic_id", "status", "score", "max_points", "answered", "correct", "elapsed_seconds"]],
+            use_container_width=True
+        )
+
     st.subheader("🧠 Recent Answers")
+    with phase("dashboard_recent"):
+        df = pd.DataFrame(get_user_results(selected_email, since=since, until=until, limit=20))
     st.dataframe(
-        df[["question_id", "user_answers", "correct_answers", "score", "timestamp", "topic_id"]].tail(20),
+        df.reindex(columns=["question_id", "user_answers", "correct_answers", "score", "timestamp", "topic_id"]),
         use_container_width=True
     )
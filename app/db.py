@@ -0,0 +1,118 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from pymongo import MongoClient, monitoring
+from config import mongo_config
+from instrumentation import command_metrics, register_gauges
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool counters fed by pymongo's pool events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.open = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.failed_checkouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_ready(self, event): pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event):
+        # Check-out runs on the calling thread, so a thread-local start time is enough
+        self._local.started = time.perf_counter()
+
+    def _waited_ms(self) -> float:
+        started = getattr(self._local, "started", None)
+        return (time.perf_counter() - started) * 1000 if started else 0.0
+
+    def connection_check_out_failed(self, event):
+        waited = self._waited_ms()
+        with self._lock:
+            self.failed_checkouts += 1
+            self.wait_ms_total += waited
+
+    def connection_checked_out(self, event):
+        waited = self._waited_ms()
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.wait_ms_total += waited
+            self.wait_ms_max = max(self.wait_ms_max, waited)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.checkouts + self.failed_checkouts
+            return {
+                "open_connections": self.open,
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "failed_checkouts": self.failed_checkouts,
+                "avg_wait_ms": round(self.wait_ms_total / attempts, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.wait_ms_max, 3),
+            }
+
+
+_cfg = mongo_config()
+_pool_metrics = PoolMetrics()
+_client: Optional[MongoClient] = None
+_client_lock = threading.Lock()
+
+
+def _client_options() -> Dict[str, Any]:
+    options = {
+        "maxPoolSize": _cfg["max_pool_size"],
+        "minPoolSize": _cfg["min_pool_size"],
+        "maxIdleTimeMS": _cfg["max_idle_time_ms"],
+        "waitQueueTimeoutMS": _cfg["wait_queue_timeout_ms"],
+        "connectTimeoutMS": _cfg["connect_timeout_ms"],
+        "socketTimeoutMS": _cfg["socket_timeout_ms"],
+        "serverSelectionTimeoutMS": _cfg["server_selection_timeout_ms"],
+        "retryWrites": _cfg["retry_writes"],
+        "w": int(_cfg["write_concern"]) if _cfg["write_concern"].isdigit() else _cfg["write_concern"],
+        "event_listeners": [_pool_metrics, command_metrics],
+    }
+    if _cfg["compressors"]:
+        options["compressors"] = _cfg["compressors"]
+    return options
+
+
+def get_client() -> MongoClient:
+    """The one MongoClient (and connection pool) shared by every module in the process."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MongoClient(_cfg["uri"], **_client_options())
+        return _client
+
+
+def get_db():
+    return get_client()[_cfg["db_name"]]
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    return _pool_metrics.snapshot()
+
+
+register_gauges(lambda: {f"quizapp_mongo_pool_{k}": v for k, v in get_pool_stats().items()})
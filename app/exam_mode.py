@@ -0,0 +1,79 @@
+import hashlib
+import hmac
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import streamlit.components.v1 as components
+
+from auth import cookie_signing_key
+from config import exam_config
+from image_store import get_image_data_uri
+
+_cfg = exam_config()
+_component = components.declare_component(
+    "quizapp_exam", path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "exam_component")
+)
+
+
+def _secret() -> bytes:
+    secret = _cfg["signing_secret"] or cookie_signing_key()
+    return secret.encode("utf-8")
+
+
+def exam_token(attempt_id: str, email: str, ordinals: Sequence[int], end_time: float) -> str:
+    """Bind a submission to one attempt, user, question set and deadline."""
+    message = f"{attempt_id}|{email}|{','.join(map(str, ordinals))}|{end_time:.3f}".encode("utf-8")
+    return f"{attempt_id}.{hmac.new(_secret(), message, hashlib.sha256).hexdigest()}"
+
+
+def verify_token(submitted: Any, expected: str) -> bool:
+    return isinstance(submitted, str) and hmac.compare_digest(submitted, expected)
+
+
+def build_payload(questions: Sequence[Any], perms: Dict[int, bytes], token: str, end_time: float) -> Dict[str, Any]:
+    """What the browser gets: shuffled option labels and texts, never the answer keys.
+
+    Ingested images are inlined from the image cache; a URL not yet ingested
+    is passed through only if the browser can load it itself.
+    """
+    items = []
+    for i, q in enumerate(questions):
+        image = get_image_data_uri(q.image_hash) if q.image_hash else None
+        if image is None and isinstance(q.image, str) and q.image.startswith(("http://", "https://")):
+            image = q.image
+        items.append({
+            "id": q.id,
+            "text": q.text,
+            "type": q.type,
+            "image": image,
+            "options": [[label, text] for label, _, text in q.options_view(perms[i])],
+        })
+    return {"token": token, "end_time": end_time, "server_time": time.time(), "questions": items}
+
+
+def render_exam(payload: Dict[str, Any], key: str) -> Optional[Dict[str, Any]]:
+    """Show the exam; returns the submitted batch once, on the rerun the browser triggers."""
+    return _component(exam=payload, key=key, default=None)
+
+
+def score_submission(questions: Sequence[Any], perms: Dict[int, bytes], submission: Dict[str, Any], max_seconds: float) -> List[Tuple[int, List[str], int, Optional[float]]]:
+    """``(index, user_keys, gained, elapsed_seconds)`` per question, scored like a normal submit."""
+    answers = submission.get("answers") or {}
+    elapsed = submission.get("elapsed") or {}
+    scored = []
+    for i, q in enumerate(questions):
+        key_map = {label: key for label, key, _ in q.options_view(perms[i])}
+        labels = answers.get(str(i)) or []
+        user_keys = [key_map[label] for label in dict.fromkeys(labels) if label in key_map]
+        if q.type == "single":
+            user_keys = user_keys[:1]
+        gained = q.points if set(user_keys) == set(q.correct) else 0
+        seconds = elapsed.get(str(i))
+        seconds = min(max(float(seconds), 0.0), max_seconds) if isinstance(seconds, (int, float)) else None
+        scored.append((i, user_keys, gained, seconds))
+    return scored
+
+
+def grace_seconds() -> float:
+    return _cfg["grace_seconds"]
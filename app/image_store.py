@@ -0,0 +1,179 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+import urllib.request
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config import image_config
+from mongo_storage import get_image_blob, put_image_blob
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow ships with Streamlit, but resizing is optional
+    Image = None
+
+_cfg = image_config()
+
+
+class _LRUBytes:
+    """Size-bounded LRU of image bytes shared by every session in the process."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._items), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+
+_cache = _LRUBytes(_cfg["cache_mb"] * 1024 * 1024)
+
+
+class ImageRejected(Exception):
+    pass
+
+
+def _read_capped(stream) -> bytes:
+    data = stream.read(_cfg["max_bytes"] + 1)
+    if len(data) > _cfg["max_bytes"]:
+        raise ImageRejected(f"larger than {_cfg['max_bytes']} bytes")
+    return data
+
+
+def _local_path(source: str) -> str:
+    """Resolve ``source`` inside the configured image directory, or refuse it."""
+    root = _cfg["local_dir"]
+    if not root:
+        raise ImageRejected("local image paths are disabled (set IMAGE_LOCAL_DIR to allow them)")
+    root = os.path.realpath(root)
+    # realpath also resolves symlinks, so a link can't point back out of the directory
+    path = os.path.realpath(os.path.join(root, source))
+    if os.path.commonpath([root, path]) != root:
+        raise ImageRejected(f"outside {root}")
+    return path
+
+
+def _fetch(source: str) -> bytes:
+    if source.startswith(("http://", "https://")):
+        with urllib.request.urlopen(source, timeout=_cfg["fetch_timeout"]) as resp:
+            if not resp.geturl().startswith(("http://", "https://")):
+                raise ImageRejected(f"redirected to {resp.geturl()}")
+            return _read_capped(resp)
+    with open(_local_path(source), "rb") as f:
+        return _read_capped(f)
+
+
+def _verify(data: bytes) -> str:
+    """MIME type of ``data`` if Pillow recognises it as an image."""
+    if Image is None:
+        raise ImageRejected("Pillow is needed to check image files")
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            fmt = img.format
+            img.verify()
+    except Exception as e:
+        raise ImageRejected(f"not an image ({e})")
+    return Image.MIME.get(fmt, "application/octet-stream")
+
+
+def _display_variant(data: bytes) -> Optional[Tuple[bytes, str]]:
+    if Image is None:
+        return None
+    with Image.open(io.BytesIO(data)) as img:
+        if img.width <= _cfg["display_width"]:
+            return None
+        height = round(img.height * _cfg["display_width"] / img.width)
+        resized = img.resize((_cfg["display_width"], height))
+        fmt = "PNG" if img.mode in ("RGBA", "LA", "P") else "JPEG"
+        out = io.BytesIO()
+        resized.save(out, format=fmt)
+        return out.getvalue(), f"image/{fmt.lower()}"
+
+
+def ingest_image(source: str) -> Optional[str]:
+    """Fetch an image once, store it under its SHA-256 and return the hash.
+
+    Only http(s) URLs and paths inside ``IMAGE_LOCAL_DIR`` are fetched, up to
+    ``IMAGE_MAX_MB``, and only bytes Pillow accepts as an image are stored.
+    Returns None (and logs) otherwise, so an import is never blocked by one
+    broken link.
+    """
+    try:
+        data = _fetch(source)
+        content_type = _verify(data)
+    except Exception as e:
+        print(f"⚠️ Could not fetch image {source}: {e}")
+        return None
+    digest = hashlib.sha256(data).hexdigest()
+    put_image_blob(f"{digest}/original", data, content_type)
+    try:
+        variant = _display_variant(data)
+    except Exception as e:
+        print(f"⚠️ Could not resize image {source}: {e}")
+        variant = None
+    if variant:
+        put_image_blob(f"{digest}/display", *variant)
+    return digest
+
+
+def get_image(image_hash: str, variant: str = "display") -> Optional[bytes]:
+    """Image bytes for ``image_hash``, falling back to the original when no variant exists."""
+    for name in (variant, "original"):
+        key = f"{image_hash}/{name}"
+        data = _cache.get(key)
+        if data is None:
+            # Cache misses too (as b""), so a hash with no display variant
+            # doesn't cost a GridFS lookup on every rerun
+            data = get_image_blob(key) or b""
+            _cache.put(key, data)
+        if data:
+            return data
+    return None
+
+
+def get_image_data_uri(image_hash: str) -> Optional[str]:
+    """The display image as a ``data:`` URI, for HTML that can't be handed bytes."""
+    data = get_image(image_hash)
+    if data is None:
+        return None
+    content_type = "application/octet-stream"
+    if Image is not None:
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                content_type = Image.MIME.get(img.format, content_type)
+        except Exception:
+            pass
+    return f"data:{content_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def get_image_cache_stats() -> Dict[str, int]:
+    return _cache.stats()
@@ -1,9 +1,9 @@
-from pymongo import MongoClient
 import streamlit_authenticator_mongo as stauth
 from config import mongo_config
+from db import get_client
 
 cfg = mongo_config()
-client = MongoClient(cfg["uri"])
+client = get_client()
 
 # 🔍 Drop index BEFORE dropping the database
 try:
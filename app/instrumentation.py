@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from pymongo import monitoring
+from config import metrics_config
+
+_cfg = metrics_config()
+
+# Upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """Prometheus-style histogram keyed by a label tuple."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, labels: Tuple[str, ...], seconds: float) -> None:
+        # Layout per series: one count per bucket (+Inf last), then the sum
+        slot = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(BUCKETS) + 2)
+            series[slot] += 1
+            series[-1] += seconds
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in sorted(items):
+            base = ",".join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {int(cumulative)}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {int(cumulative)}")
+        return lines
+
+
+class Counter:
+    """Prometheus-style monotonic counter keyed by a label tuple."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1.0) -> None:
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0.0) + amount
+
+    def value(self, labels: Tuple[str, ...]) -> float:
+        with self._lock:
+            return self._series.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for labels, value in items:
+            base = ",".join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+            lines.append(f"{self.name}{{{base}}} {value:g}")
+        return lines
+
+
+phase_seconds = Histogram("quizapp_phase_seconds", "Wall time of named rerun phases.", ("phase",))
+mongo_seconds = Histogram("quizapp_mongo_command_seconds", "Mongo command latency.", ("command", "collection"))
+# Full reruns vs countdown ticks while a quiz is open; divide by quiz_seconds for a per-quiz-minute rate
+quiz_reruns = Counter("quizapp_quiz_reruns_total", "Reruns while a quiz is open, by timer mode and kind.", ("timer_mode", "kind"))
+quiz_seconds = Counter("quizapp_quiz_seconds_total", "Wall time quizzes were open, by timer mode.", ("timer_mode",))
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase_seconds.observe((name,), time.perf_counter() - started)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Times every Mongo command and logs the ones slower than ``slow_ms``."""
+
+    def __init__(self, slow_ms: float):
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._collections: Dict[Tuple[int, int], str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        with self._lock:
+            self._collections[(event.request_id, event.operation_id)] = collection
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            collection = self._collections.pop((event.request_id, event.operation_id), "")
+        seconds = event.duration_micros / 1e6
+        mongo_seconds.observe((event.command_name, collection), seconds)
+        if seconds * 1000 >= self.slow_ms:
+            status = "failed" if failed else "ok"
+            print(f"🐢 Slow Mongo {event.command_name} on '{collection}': {seconds * 1000:.1f} ms ({status})")
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+command_metrics = CommandMetrics(_cfg["slow_query_ms"])
+
+_collectors: List[Callable[[], Dict[str, float]]] = []
+_export_lock = threading.Lock()
+_exported_at = 0.0
+
+
+def register_gauges(collector: Callable[[], Dict[str, float]]) -> None:
+    """Add a callback returning ``{metric_name: value}`` gauges for each export."""
+    _collectors.append(collector)
+
+
+def render_prometheus() -> str:
+    lines = phase_seconds.render() + mongo_seconds.render() + quiz_reruns.render() + quiz_seconds.render()
+    for collector in _collectors:
+        for name, value in collector().items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def maybe_export() -> None:
+    """Write the metrics file if the export interval has passed; cheap otherwise."""
+    global _exported_at
+    now = time.monotonic()
+    if now - _exported_at < _cfg["export_seconds"] or not _export_lock.acquire(blocking=False):
+        return
+    try:
+        _exported_at = now
+        tmp = f"{_cfg['file_path']}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(render_prometheus())
+        os.replace(tmp, _cfg["file_path"])
+    finally:
+        _export_lock.release()
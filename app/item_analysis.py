@@ -0,0 +1,133 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from mongo_storage import (
+    claim_item_stats_window,
+    commit_item_stats_window,
+    get_attempt_totals,
+    get_item_stats,
+    iter_attempt_results,
+    save_item_stats,
+)
+
+# Additive per-question sums; every statistic shown is derived from these, so
+# a refresh only has to fold new results into the stored snapshot.
+# pb_* are the point-biserial sums of x (answered correctly) and y (attempt total).
+SUM_FIELDS = ["n", "n_correct", "time_n", "time_sum", "pb_n", "pb_x", "pb_y", "pb_y2", "pb_xy"]
+COUNT_FIELDS = {"n", "n_correct", "time_n", "pb_n", "pb_x"}
+
+
+def chunk_sums(rows: List[Dict[str, Any]], totals: Dict[str, int]) -> Tuple[pd.DataFrame, pd.Series]:
+    """Per-question sums and ``(question_id, option)`` pick counts for one chunk of results."""
+    df = pd.DataFrame(rows, columns=["question_id", "attempt_id", "score", "user_answers", "elapsed_seconds"])
+    x = (pd.to_numeric(df["score"], errors="coerce").fillna(0) > 0).astype(np.int64)
+    y = df["attempt_id"].map(totals).astype(float)
+    has_y = y.notna()
+    y = y.fillna(0.0)
+    elapsed = pd.to_numeric(df["elapsed_seconds"], errors="coerce")
+
+    sums = pd.DataFrame({
+        "question_id": df["question_id"],
+        "n": 1,
+        "n_correct": x,
+        "time_n": elapsed.notna().astype(np.int64),
+        "time_sum": elapsed.fillna(0.0),
+        "pb_n": has_y.astype(np.int64),
+        "pb_x": x * has_y,
+        "pb_y": y,
+        "pb_y2": y * y,
+        "pb_xy": x * y,
+    }).groupby("question_id", sort=False).sum()
+
+    picks = df[["question_id", "user_answers"]].explode("user_answers").dropna()
+    options = picks.groupby(["question_id", "user_answers"], sort=False).size()
+    return sums, options
+
+
+def derive(sums: pd.DataFrame, options: pd.Series) -> List[Dict[str, Any]]:
+    """Turn per-question sums into snapshot documents."""
+    n = sums["n"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        difficulty = sums["n_correct"].to_numpy() / n
+        mean_seconds = sums["time_sum"].to_numpy() / sums["time_n"].to_numpy()
+        k, sx, sy, sy2, sxy = (sums[c].to_numpy(dtype=float) for c in ("pb_n", "pb_x", "pb_y", "pb_y2", "pb_xy"))
+        # x is 0/1, so sum(x^2) == sum(x)
+        discrimination = (k * sxy - sx * sy) / np.sqrt((k * sx - sx * sx) * (k * sy2 - sy * sy))
+
+    rates = options.div(sums["n"], level="question_id")
+    by_question: Dict[Any, Dict[str, int]] = {}
+    for (qid, option), count in options.items():
+        by_question.setdefault(qid, {})[str(option)] = int(count)
+    rate_map: Dict[Any, Dict[str, float]] = {}
+    for (qid, option), rate in rates.items():
+        rate_map.setdefault(qid, {})[str(option)] = round(float(rate), 4)
+
+    def clean(value: float) -> Optional[float]:
+        return None if not np.isfinite(value) else round(float(value), 4)
+
+    docs = []
+    for i, qid in enumerate(sums.index):
+        row = sums.iloc[i]
+        docs.append({
+            "question_id": qid.item() if hasattr(qid, "item") else qid,
+            **{f: int(row[f]) if f in COUNT_FIELDS else float(row[f]) for f in SUM_FIELDS},
+            "options": by_question.get(qid, {}),
+            "difficulty": clean(difficulty[i]),
+            "discrimination": clean(discrimination[i]),
+            "distractor_rates": rate_map.get(qid, {}),
+            "mean_seconds": clean(mean_seconds[i]),
+        })
+    return docs
+
+
+def _stored_sums(docs: List[Dict[str, Any]]) -> Tuple[pd.DataFrame, pd.Series]:
+    sums = pd.DataFrame([{f: d.get(f, 0) for f in ["question_id"] + SUM_FIELDS} for d in docs]).set_index("question_id")
+    picks = {(d["question_id"], option): count for d in docs for option, count in d.get("options", {}).items()}
+    options = pd.Series(picks, dtype=np.int64)
+    if picks:
+        options.index.names = ["question_id", "user_answers"]
+    return sums, options
+
+
+def refresh_item_stats(topic_id: str, rebuild: bool = False, chunk_size: int = 50_000, progress: Optional[Callable[[int], None]] = None) -> int:
+    """Fold attempts finished since the last refresh into the snapshot of a topic's current revision; returns questions touched.
+
+    Safe to run again after a failure: the slice is only committed once its
+    statistics are saved, and questions already saved for it aren't added twice.
+    """
+    window = claim_item_stats_window(topic_id, rebuild)
+    if window is None:
+        return 0
+    version, since, until = window
+    totals = get_attempt_totals(topic_id, version, since, until)
+
+    sums: Optional[pd.DataFrame] = None
+    options: Optional[pd.Series] = None
+    seen = 0
+    for rows in iter_attempt_results(list(totals), chunk_size):
+        chunk, picks = chunk_sums(rows, totals)
+        sums = chunk if sums is None else sums.add(chunk, fill_value=0)
+        options = picks if options is None else options.add(picks, fill_value=0)
+        seen += len(rows)
+        if progress:
+            progress(seen)
+    docs: List[Dict[str, Any]] = []
+    if sums is not None:
+        stored = get_item_stats(topic_id, version, [q.item() if hasattr(q, "item") else q for q in sums.index])
+        # Saved for this slice by an earlier try that failed before committing it
+        done = [d["question_id"] for d in stored if d.get("through") == until]
+        if done:
+            sums = sums[~sums.index.isin(done)]
+            options = options[~options.index.get_level_values("question_id").isin(done)]
+        old = [d for d in stored if d.get("through") != until]
+        if old:
+            old_sums, old_options = _stored_sums(old)
+            sums = sums.add(old_sums, fill_value=0)
+            options = options.add(old_options, fill_value=0) if len(old_options) else options
+        if len(sums):
+            docs = derive(sums, options.astype(np.int64))
+    save_item_stats(topic_id, version, until, docs)
+    commit_item_stats_window(topic_id, version, until)
+    return len(docs)
@@ -0,0 +1,194 @@
+"""Mongo-backed job queue for admin operations too heavy for a rerun.
+
+The admin page only enqueues and polls. The work runs in a separate pool of
+worker processes:
+
+    cd app && python -m jobs --processes 2
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import time
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+from config import job_config
+from mongo_storage import (
+    claim_job,
+    complete_job,
+    delete_topic,
+    delete_upload,
+    discard_import,
+    delete_user_data,
+    enqueue_job,
+    fail_job,
+    get_job,
+    get_job_by_key,
+    open_upload,
+    put_upload,
+    update_job_progress,
+)
+
+_cfg = job_config()
+
+Progress = Callable[[int, int, str], None]
+_handlers: Dict[str, Callable[[Dict[str, Any], Progress], Any]] = {}
+
+
+def handler(kind: str):
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(kind: str, params: Dict[str, Any], idempotency_key: Optional[str] = None) -> str:
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    return enqueue_job(kind, params, idempotency_key, _cfg["max_attempts"])
+
+
+def enqueue_upload(kind: str, params: Dict[str, Any], filename: str, stream: Any, idempotency_key: str) -> str:
+    """Queue a job that reads an uploaded file; the file is only stored when a job will use it."""
+    existing = get_job_by_key(idempotency_key)
+    if existing and existing["status"] in ("queued", "running"):
+        return existing["job_id"]
+    upload_id = put_upload(filename, stream)
+    job_id = enqueue(kind, {**params, "upload_id": upload_id}, idempotency_key)
+    job = get_job(job_id)
+    if job is None or job["params"].get("upload_id") != upload_id:
+        # Another click queued the same file first
+        delete_upload(upload_id)
+    return job_id
+
+
+# -------- Handlers --------
+# Each one must be safe to run again after a crash part-way through.
+
+@handler("import_topic")
+def _import_topic(params, progress):
+    from question_import import import_topic_stream
+
+    with open_upload(params["upload_id"]) as stream:
+        topic_id, issues = import_topic_stream(
+            params["topic_name"],
+            stream,
+            progress=lambda done, total: progress(done, total, "Importing questions"),
+        )
+    delete_upload(params["upload_id"])
+    return {"topic_id": topic_id, "issues": issues}
+
+
+@handler("delete_topic")
+def _delete_topic(params, progress):
+    return {"deleted": delete_topic(params["topic_id"])}
+
+
+@handler("discard_import")
+def _discard_import(params, progress):
+    return {"discarded": discard_import(params["version"])}
+
+
+@handler("delete_user")
+def _delete_user(params, progress):
+    return delete_user_data(
+        params["email"],
+        progress=lambda done, total: progress(done, total, "Deleting results"),
+    )
+
+
+@handler("provision_users")
+def _provision_users(params, progress):
+    from user_import import parse_users, provision_users
+
+    with open_upload(params["upload_id"]) as stream:
+        rows = parse_users(stream, params["filename"])
+    report = provision_users(rows, progress=lambda done, total: progress(done, total, "Hashing and inserting users"))
+    # The upload holds plaintext passwords; don't keep it past a successful run
+    delete_upload(params["upload_id"])
+    counts = {}
+    for entry in report:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    return {**counts, "report": [r for r in report if r["status"] != "created"]}
+
+
+@handler("item_stats")
+def _item_stats(params, progress):
+    from item_analysis import refresh_item_stats
+
+    questions = refresh_item_stats(
+        params["topic_id"],
+        rebuild=params.get("rebuild", False),
+        progress=lambda rows: progress(rows, 0, "Aggregating results"),
+    )
+    return {"questions": questions}
+
+
+# -------- Worker --------
+
+class LostLease(Exception):
+    pass
+
+
+def run_job(job: Dict[str, Any], worker: str) -> None:
+    job_id = job["job_id"]
+
+    def progress(done: int, total: int, message: str = "") -> None:
+        if not update_job_progress(job_id, worker, done, total, message, _cfg["lease_seconds"]):
+            raise LostLease(job_id)
+
+    try:
+        result = _handlers[job["kind"]](job["params"], progress)
+    except LostLease:
+        print(f"⚠️ [{worker}] Lost the lease on job {job_id}; another worker has it")
+        return
+    except Exception as e:
+        traceback.print_exc()
+        status = fail_job(job_id, worker, f"{type(e).__name__}: {e}", _cfg["retry_seconds"])
+        print(f"❌ [{worker}] Job {job_id} ({job['kind']}) failed, now {status}")
+        if status == "failed" and "upload_id" in job["params"]:
+            # No attempts left; uploading the file again queues a fresh run
+            delete_upload(job["params"]["upload_id"])
+        return
+    complete_job(job_id, worker, result)
+    print(f"✅ [{worker}] Job {job_id} ({job['kind']}) done")
+
+
+def work_loop(worker: str) -> None:
+    print(f"👷 Worker {worker} polling every {_cfg['poll_seconds']}s")
+    while True:
+        job = claim_job(worker, _cfg["lease_seconds"])
+        if job is None:
+            time.sleep(_cfg["poll_seconds"])
+            continue
+        if job["kind"] not in _handlers:
+            fail_job(job["job_id"], worker, f"Unknown job kind '{job['kind']}'", _cfg["retry_seconds"])
+            continue
+        run_job(job, worker)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=_cfg["processes"])
+    args = parser.parse_args()
+
+    # spawn, so no process inherits a MongoClient from its parent
+    ctx = multiprocessing.get_context("spawn")
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    workers = [
+        ctx.Process(target=work_loop, args=(f"{prefix}-{i}",), name=f"job-worker-{i}")
+        for i in range(args.processes)
+    ]
+    for w in workers:
+        w.start()
+    try:
+        for w in workers:
+            w.join()
+    except KeyboardInterrupt:
+        for w in workers:
+            w.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,8 @@ from config import get_config
 from quiz import QuizApp
 from dashboard import show_dashboard
 from admin import show_admin_panel
-from auth import get_authenticator
+from auth import get_authenticator, get_user_doc
+from instrumentation import phase, maybe_export
 
 st.set_page_config(page_title="Quiz Training App",layout="wide")
 
@@ -33,8 +34,9 @@ def inject_custom_css():
 inject_custom_css()
 
 # 🔐 Authenticate user via email
-authenticator = get_authenticator()
-name, auth_status, email = authenticator.login("Login", "main")
+with phase("auth"):
+    authenticator = get_authenticator()
+    name, auth_status, email = authenticator.login("Login", "main")
 
 # 🛡️ Handle login state
 if auth_status is False:
@@ -44,8 +46,9 @@ elif auth_status is None or not email:
     st.warning("Please enter your credentials")
     st.stop()
 
-# ✅ Fetch user info from MongoDB
-user_doc = authenticator.collection.find_one({"email": email})
+# ✅ Fetch user info from the shared credential store
+with phase("user_lookup"):
+    user_doc = get_user_doc(email)
 if not user_doc:
     st.error(f"User '{email}' not found in MongoDB.")
     authenticator.logout("Logout")
@@ -66,19 +69,23 @@ config = get_config()
 app = QuizApp(config)
 
 # 🧩 Page Routing
-if page == "Home":
-    st.title("🏠 Welcome to the Quiz Platform")
-    st.markdown(f"Hello **{user_doc['name']}**, ready to test your knowledge?")
-    st.markdown("Use the sidebar to start a quiz, view your performance dashboard, or manage topics in the Admin panel.")
+with phase(f"page_{page.lower()}"):
+    if page == "Home":
+        st.title("🏠 Welcome to the Quiz Platform")
+        st.markdown(f"Hello **{user_doc['name']}**, ready to test your knowledge?")
+        st.markdown("Use the sidebar to start a quiz, view your performance dashboard, or manage topics in the Admin panel.")
 
-elif page == "Quiz":
-    app.run()
+    elif page == "Quiz":
+        app.run()
 
-elif page == "Dashboard":
-    show_dashboard()
+    elif page == "Dashboard":
+        show_dashboard()
 
-elif page == "Admin":
-    if user_role != "admin":
-        st.warning("Access denied. Admins only.")
-        st.stop()
-    show_admin_panel()
+    elif page == "Admin":
+        if user_role != "admin":
+            st.warning("Access denied. Admins only.")
+            st.stop()
+        show_admin_panel()
+
+# 📈 Metrics export (rate-limited, so effectively free on most reruns)
+maybe_export()
@@ -1,18 +1,28 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
 import uuid
-from datetime import datetime
-from typing import List, Dict, Any, Optional
-from pymongo import MongoClient, ASCENDING
-from config import mongo_config
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Callable, Tuple
+import gridfs
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from config import cache_config
+from db import get_db
+from validation import ValidationEngine
 
-_cfg = mongo_config()
-_client: Optional[MongoClient] = None
+_cache_cfg = cache_config()
 _db = None
 
 def _get_db():
-    global _client, _db
+    global _db
     if _db is None:
-        _client = MongoClient(_cfg["uri"])
-        _db = _client[_cfg["db_name"]]
+        _db = get_db()
         _ensure_indexes()
     return _db
 
@@ -21,111 +31,1131 @@ def _ensure_indexes():
     if db is None:
         return
     db.users.create_index([("email", ASCENDING)], unique=True)
+    db.users.create_index([("name", ASCENDING)])
     db.results.create_index([("email", ASCENDING), ("timestamp", ASCENDING)])
-    db.results.create_index([("topic_id", ASCENDING)])
+    db.results.create_index([("topic_id", ASCENDING), ("timestamp", ASCENDING)])
+    db.results.create_index([("attempt_id", ASCENDING)])
     db.topics.create_index([("topic_id", ASCENDING)], unique=True)
     db.topics.create_index([("topic_name", ASCENDING)], unique=True)
+    db.topic_versions.create_index([("version", ASCENDING)], unique=True)
+    db.questions.create_index([("topic_id", ASCENDING), ("ordinal", ASCENDING)], unique=True)
+    db.questions.create_index(
+        [("topic_id", ASCENDING), ("category", ASCENDING), ("difficulty", ASCENDING), ("ordinal", ASCENDING)]
+    )
+    db.attempts.create_index([("attempt_id", ASCENDING)], unique=True)
+    db.attempts.create_index([("email", ASCENDING), ("started_at", DESCENDING)])
+    db.attempts.create_index([("topic_id", ASCENDING), ("status", ASCENDING), ("started_at", ASCENDING)])
+    db.attempts.create_index([("topic_id", ASCENDING), ("version", ASCENDING), ("finished_at", ASCENDING)])
+    db.item_stats.create_index([("topic_id", ASCENDING), ("question_id", ASCENDING)], unique=True)
+    db.quiz_sessions.create_index([("attempt_id", ASCENDING)], unique=True)
+    db.quiz_sessions.create_index([("email", ASCENDING), ("status", ASCENDING)])
+    db.jobs.create_index([("job_id", ASCENDING)], unique=True)
+    db.jobs.create_index([("idempotency_key", ASCENDING)], unique=True, sparse=True)
+    db.jobs.create_index([("status", ASCENDING), ("run_after", ASCENDING)])
+    db.jobs.create_index([("created_at", DESCENDING)])
+    db.daily_rollups.create_index(
+        [("email", ASCENDING), ("topic_id", ASCENDING), ("day", ASCENDING)], unique=True
+    )
+    db.daily_rollups.create_index([("email", ASCENDING), ("day", ASCENDING)])
+
+# -------- Version stamps --------
+
+_listeners: Dict[str, List[Callable[[], None]]] = {}
+
+def on_change(name: str, callback: Callable[[], None]) -> None:
+    """Register a callback run in this process whenever ``name`` is bumped."""
+    _listeners.setdefault(name, []).append(callback)
+
+def get_version(name: str) -> int:
+    db = _get_db()
+    doc = db.meta.find_one({"_id": f"{name}_version"}, {"value": 1})
+    return doc.get("value", 0) if doc else 0
+
+def _bump_version(name: str) -> None:
+    db = _get_db()
+    db.meta.update_one({"_id": f"{name}_version"}, {"$inc": {"value": 1}}, upsert=True)
+    for callback in _listeners.get(name, []):
+        callback()
 
 # -------- Users --------
 
-def get_users() -> List[Dict[str, Any]]:
+def normalize_email(email: str) -> str:
+    """Emails are stored lowercased: the login form looks them up by the lowercased typed address."""
+    return email.strip().lower()
+
+def find_users(search: str = "", after: Optional[str] = None, limit: int = 25, fields: Tuple[str, ...] = ("name", "role")) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of users ordered by email, plus the cursor for the next page.
+
+    ``search`` is a prefix match on email (case-insensitive, as emails are
+    stored lowercased) or name; ``after`` is the cursor returned by the
+    previous call. Password hashes are never returned.
+    """
     db = _get_db()
-    return list(db.users.find({}, {"_id": 0}).sort("email", ASCENDING))
+    projection = {"_id": 0, "email": 1, **{f: 1 for f in fields if f != "password"}}
+    query: Dict[str, Any] = {}
+    if search:
+        query["$or"] = [
+            {"email": {"$regex": f"^{re.escape(normalize_email(search))}"}},
+            {"name": {"$regex": f"^{re.escape(search)}"}},
+        ]
+    if after:
+        query["email"] = {"$gt": after}
+    docs = list(db.users.find(query, projection).sort("email", ASCENDING).limit(limit + 1))
+    next_cursor = docs[limit - 1]["email"] if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+def get_user_credentials() -> Dict[str, Dict[str, str]]:
+    db = _get_db()
+    projection = {"_id": 0, "email": 1, "name": 1, "password": 1, "role": 1}
+    credentials = {}
+    for user in db.users.find({}, projection):
+        if not all(k in user for k in ("email", "password", "name")):
+            print(f"⚠️ Skipping invalid user document: {user.get('email')}")
+            continue
+        credentials[user["email"]] = {
+            "email": user["email"],
+            "name": user["name"],
+            "password": user["password"],
+            "role": user.get("role", "user")
+        }
+    return credentials
 
 def delete_user(email: str) -> bool:
     db = _get_db()
     res = db.users.delete_one({"email": email})
-    # Optionally cascade delete results:
-    # db.results.delete_many({"email": email})
+    # Results are cascaded by delete_user_data, which runs as a background job
+    if res.deleted_count == 1:
+        _bump_version("users")
     return res.deleted_count == 1
 
+def delete_user_data(email: str, batch_size: int = 10_000, progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+    """Delete a user's results in bounded batches, then their rollups, attempts, quiz sessions and account."""
+    db = _get_db()
+    total = db.results.count_documents({"email": email})
+    deleted = 0
+    while True:
+        ids = [d["_id"] for d in db.results.find({"email": email}, {"_id": 1}).limit(batch_size)]
+        if not ids:
+            break
+        deleted += db.results.delete_many({"_id": {"$in": ids}}).deleted_count
+        if progress:
+            progress(deleted, total)
+    counts = {
+        "results": deleted,
+        "daily_rollups": db.daily_rollups.delete_many({"email": email}).deleted_count,
+        "attempts": db.attempts.delete_many({"email": email}).deleted_count,
+        "quiz_sessions": db.quiz_sessions.delete_many({"email": email}).deleted_count,
+    }
+    counts["users"] = int(delete_user(email))
+    return counts
+
 def create_user(email: str, name: str, hashed_pw: str, role: str) -> bool:
     db = _get_db()
-    if db.users.find_one({"email": email}):
-        return False
     user_doc = {
-        "email": email,
+        "email": normalize_email(email),
         "name": name,
         "password": hashed_pw,
         "role": role
     }
     user_doc.pop("username", None)  # Defensive cleanup
-    db.users.insert_one(user_doc)
+    try:
+        # The unique email index rejects duplicates; no need to look first
+        db.users.insert_one(user_doc)
+    except DuplicateKeyError:
+        return False
+    _bump_version("users")
     return True
 
+def create_users(users: List[Dict[str, Any]]) -> List[str]:
+    """Insert many ``{email, name, password, role}`` docs; returns "created" or "duplicate" per row."""
+    if not users:
+        return []
+    db = _get_db()
+    statuses = ["created"] * len(users)
+    try:
+        db.users.insert_many([{**u, "email": normalize_email(u["email"])} for u in users], ordered=False)
+    except BulkWriteError as e:
+        for err in e.details.get("writeErrors", []):
+            statuses[err["index"]] = "duplicate" if err.get("code") == 11000 else f"error: {err.get('errmsg')}"
+    if "created" in statuses:
+        _bump_version("users")
+    return statuses
+
 def update_user(email: str, updates: Dict[str, Any]) -> bool:
     db = _get_db()
     updates.pop("username", None)  # Defensive cleanup
-    result = db.users.update_one({"email": email}, {"$set": updates})
+    if "email" in updates:
+        updates["email"] = normalize_email(updates["email"])
+    result = db.users.update_one({"email": normalize_email(email)}, {"$set": updates})
+    if result.modified_count > 0:
+        _bump_version("users")
     return result.modified_count > 0
 
 # -------- Results --------
 
-def save_result_mongo(email: str, question_id: Any, user_answers: List[str], correct_answers: List[str], score: int, topic_id: Optional[str] = None) -> None:
-    db = _get_db()
-    db.results.insert_one({
+def build_result(email: str, question_id: Any, user_answers: List[str], correct_answers: List[str], score: int, topic_id: Optional[str] = None, attempt_id: Optional[str] = None, elapsed_seconds: Optional[float] = None) -> Dict[str, Any]:
+    # _id is assigned up front so a retried batch can't insert a row twice
+    return {
+        "_id": ObjectId(),
         "email": email,
         "question_id": question_id,
         "user_answers": user_answers,
         "correct_answers": correct_answers,
         "score": score,
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.utcnow(),
         "topic_id": topic_id,
-    })
+        "attempt_id": attempt_id,
+        "elapsed_seconds": None if elapsed_seconds is None else round(elapsed_seconds, 1),
+    }
 
-def get_user_results(email: str) -> List[Dict[str, Any]]:
+def _attempt_updates(results: List[Dict[str, Any]]) -> List[UpdateOne]:
+    # Guarded on result_id so replaying a batch never counts an answer twice
+    ops = []
+    for r in results:
+        if not r.get("attempt_id"):
+            continue
+        ops.append(UpdateOne(
+            {"attempt_id": r["attempt_id"], "outcomes.result_id": {"$ne": r["_id"]}},
+            {
+                "$inc": {"score": r["score"], "answered": 1, "correct": 1 if r["score"] > 0 else 0},
+                "$push": {"outcomes": {
+                    "result_id": r["_id"],
+                    "question_id": r["question_id"],
+                    "user_answers": r["user_answers"],
+                    "correct_answers": r["correct_answers"],
+                    "score": r["score"],
+                }},
+            },
+        ))
+    return ops
+
+def _day(timestamp: Any) -> str:
+    return timestamp.strftime("%Y-%m-%d") if isinstance(timestamp, datetime) else str(timestamp)[:10]
+
+def _rollup_updates(results: List[Dict[str, Any]]) -> List[UpdateOne]:
+    totals: Dict[tuple, Dict[str, int]] = {}
+    for r in results:
+        key = (r["email"], r.get("topic_id"), _day(r["timestamp"]))
+        t = totals.setdefault(key, {"answered": 0, "score": 0, "correct": 0})
+        t["answered"] += 1
+        t["score"] += r["score"]
+        t["correct"] += 1 if r["score"] > 0 else 0
+    return [
+        UpdateOne({"email": email, "topic_id": topic_id, "day": day}, {"$inc": inc}, upsert=True)
+        for (email, topic_id, day), inc in totals.items()
+    ]
+
+def save_results(results: List[Dict[str, Any]]) -> None:
+    if not results:
+        return
     db = _get_db()
-    return list(db.results.find({"email": email}, {"_id": 0}).sort("timestamp", ASCENDING))
+    try:
+        db.results.insert_many(results, ordered=False)
+    except BulkWriteError as e:
+        # Rows already written by an earlier attempt are fine; anything else is not
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != 11000 for err in errors):
+            raise
+    attempt_ops = _attempt_updates(results)
+    if attempt_ops:
+        db.attempts.bulk_write(attempt_ops, ordered=False)
+    _roll_up([r["_id"] for r in results])
 
-# -------- Topics --------
+def _roll_up(result_ids: List[Any]) -> None:
+    """Add the rows not yet marked ``rolled_up`` to the daily rollups, then mark them.
 
-def save_topic(topic_name: str, questions: List[Dict[str, Any]]) -> str:
+    Recoverable on its own: a batch replayed after a failure here rolls up
+    whatever it didn't get to, whether or not its insert was a duplicate.
+    A crash between the ``$inc`` and the mark can still count a row twice;
+    ``rebuild_daily_rollups`` repairs that.
+    """
     db = _get_db()
-    topic_id = str(uuid.uuid4())
-    db.topics.insert_one({
+    pending = list(db.results.find(
+        {"_id": {"$in": result_ids}, "rolled_up": {"$ne": True}},
+        {"email": 1, "topic_id": 1, "timestamp": 1, "score": 1},
+    ))
+    rollup_ops = _rollup_updates(pending)
+    if not rollup_ops:
+        return
+    db.daily_rollups.bulk_write(rollup_ops, ordered=False)
+    db.results.update_many({"_id": {"$in": [r["_id"] for r in pending]}}, {"$set": {"rolled_up": True}})
+
+def save_result_mongo(email: str, question_id: Any, user_answers: List[str], correct_answers: List[str], score: int, topic_id: Optional[str] = None) -> None:
+    save_results([build_result(email, question_id, user_answers, correct_answers, score, topic_id)])
+
+def _time_range(since: Optional[datetime], until: Optional[datetime]) -> Dict[str, datetime]:
+    bounds = {}
+    if since is not None:
+        bounds["$gte"] = since
+    if until is not None:
+        bounds["$lt"] = until
+    return bounds
+
+def get_user_results(email: str, since: Optional[datetime] = None, until: Optional[datetime] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """A user's answers in ``[since, until)``, oldest first; with ``limit`` only the most recent ones.
+
+    Served by the (email, timestamp) index.
+    """
+    db = _get_db()
+    query: Dict[str, Any] = {"email": email}
+    bounds = _time_range(since, until)
+    if bounds:
+        query["timestamp"] = bounds
+    if limit is None:
+        return list(db.results.find(query, {"_id": 0, "rolled_up": 0}).sort("timestamp", ASCENDING))
+    cursor = db.results.find(query, {"_id": 0, "rolled_up": 0}).sort("timestamp", DESCENDING).limit(limit)
+    return list(reversed(list(cursor)))
+
+# -------- Daily rollups --------
+
+def get_daily_rollups(email: str, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    db = _get_db()
+    query: Dict[str, Any] = {"email": email}
+    bounds = {op: _day(value) for op, value in _time_range(since, until).items()}
+    if bounds:
+        query["day"] = bounds
+    return list(db.daily_rollups.find(query, {"_id": 0}).sort("day", ASCENDING))
+
+def rebuild_daily_rollups(email: Optional[str] = None) -> int:
+    """Regenerate rollups from raw ``results`` for one user, or everyone."""
+    db = _get_db()
+    match = {"email": email} if email else {}
+    db.daily_rollups.delete_many(match)
+    day = {"$cond": [
+        {"$eq": [{"$type": "$timestamp"}, "date"]},
+        {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+        {"$substrBytes": ["$timestamp", 0, 10]},
+    ]}
+    db.results.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": {"email": "$email", "topic_id": "$topic_id", "day": day},
+            "answered": {"$sum": 1},
+            "score": {"$sum": "$score"},
+            "correct": {"$sum": {"$cond": [{"$gt": ["$score", 0]}, 1, 0]}},
+        }},
+        {"$project": {
+            "_id": 0,
+            "email": "$_id.email",
+            "topic_id": "$_id.topic_id",
+            "day": "$_id.day",
+            "answered": 1,
+            "score": 1,
+            "correct": 1,
+        }},
+        {"$merge": {"into": "daily_rollups", "on": ["email", "topic_id", "day"], "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ], allowDiskUse=True)
+    # Counted now, so a later replay of these rows must not add them again
+    db.results.update_many({**match, "rolled_up": {"$ne": True}}, {"$set": {"rolled_up": True}})
+    return db.daily_rollups.count_documents(match)
+
+# -------- Attempts --------
+
+def create_attempt(email: str, topic_id: Optional[str], question_ids: List[Any], max_points: int, duration_seconds: int, version: Optional[str] = None) -> str:
+    db = _get_db()
+    attempt_id = str(uuid.uuid4())
+    db.attempts.insert_one({
+        "attempt_id": attempt_id,
+        "email": email,
         "topic_id": topic_id,
-        "topic_name": topic_name,
-        "questions": questions,
-        "created_at": datetime.utcnow().isoformat()
+        "version": version,
+        "question_ids": question_ids,
+        "max_points": max_points,
+        "duration_seconds": duration_seconds,
+        "score": 0,
+        "answered": 0,
+        "correct": 0,
+        "outcomes": [],
+        "status": "in_progress",
+        "started_at": datetime.utcnow(),
+        "finished_at": None,
+        "elapsed_seconds": None,
     })
-    return topic_id
+    return attempt_id
 
-def get_all_topics() -> List[Dict[str, str]]:
+def finalize_attempt(attempt_id: str, elapsed_seconds: float, status: str = "completed") -> bool:
+    db = _get_db()
+    res = db.attempts.update_one(
+        {"attempt_id": attempt_id, "status": "in_progress"},
+        {"$set": {
+            "status": status,
+            "finished_at": datetime.utcnow(),
+            "elapsed_seconds": round(elapsed_seconds, 1),
+        }}
+    )
+    return res.modified_count == 1
+
+def get_user_attempts(email: str, limit: int = 10) -> List[Dict[str, Any]]:
     db = _get_db()
-    cursor = db.topics.find({}, {"_id": 0, "topic_id": 1, "topic_name": 1}).sort("topic_name", ASCENDING)
+    cursor = db.attempts.find({"email": email}, {"_id": 0, "outcomes": 0}).sort("started_at", DESCENDING).limit(limit)
     return list(cursor)
 
-def get_topic_questions(topic_id: str) -> List[Dict[str, Any]]:
+def backfill_attempts(gap_minutes: int = 30) -> int:
+    """Group legacy ``results`` rows without an attempt_id into attempts.
+
+    Rows for the same email and topic belong to one attempt until the gap
+    between consecutive answers exceeds ``gap_minutes``.
+    """
+    db = _get_db()
+    gap = timedelta(minutes=gap_minutes)
+    created = 0
+    group: List[Dict[str, Any]] = []
+
+    def flush_group():
+        nonlocal created
+        if not group:
+            return
+        attempt_id = str(uuid.uuid4())
+        first, last = group[0], group[-1]
+        db.attempts.insert_one({
+            "attempt_id": attempt_id,
+            "email": first["email"],
+            "topic_id": first.get("topic_id"),
+            "question_ids": [r["question_id"] for r in group],
+            "max_points": None,
+            "duration_seconds": None,
+            "score": sum(r.get("score", 0) for r in group),
+            "answered": len(group),
+            "correct": sum(1 for r in group if r.get("score", 0) > 0),
+            "outcomes": [{
+                "result_id": r["_id"],
+                "question_id": r["question_id"],
+                "user_answers": r.get("user_answers", []),
+                "correct_answers": r.get("correct_answers", []),
+                "score": r.get("score", 0),
+            } for r in group],
+            "status": "backfilled",
+            "started_at": first["timestamp"],
+            "finished_at": last["timestamp"],
+            "elapsed_seconds": (last["_ts"] - first["_ts"]).total_seconds(),
+        })
+        db.results.update_many({"_id": {"$in": [r["_id"] for r in group]}}, {"$set": {"attempt_id": attempt_id}})
+        created += 1
+        group.clear()
+
+    cursor = db.results.find({"attempt_id": None}).sort(
+        [("email", ASCENDING), ("topic_id", ASCENDING), ("timestamp", ASCENDING)]
+    ).allow_disk_use(True)
+    for row in cursor:
+        ts = row["timestamp"]
+        row["_ts"] = datetime.fromisoformat(ts) if isinstance(ts, str) else ts
+        if group:
+            prev = group[-1]
+            if (row["email"], row.get("topic_id")) != (prev["email"], prev.get("topic_id")) or row["_ts"] - prev["_ts"] > gap:
+                flush_group()
+        group.append(row)
+    flush_group()
+    return created
+
+# -------- Quiz sessions --------
+
+def create_quiz_session(state: Dict[str, Any]) -> None:
+    db = _get_db()
+    # Only one live quiz per user; starting a new one retires the old session
+    db.quiz_sessions.update_many(
+        {"email": state["email"], "status": "active"},
+        {"$set": {"status": "abandoned", "updated_at": datetime.utcnow()}}
+    )
+    db.quiz_sessions.insert_one({**state, "status": "active", "updated_at": datetime.utcnow()})
+
+def get_active_quiz_session(email: str) -> Optional[Dict[str, Any]]:
+    db = _get_db()
+    return db.quiz_sessions.find_one({"email": email, "status": "active"}, {"_id": 0})
+
+def update_quiz_session(attempt_id: str, rev: int, set_fields: Dict[str, Any], push_fields: Dict[str, List[Any]]) -> bool:
+    """Apply a diff if the stored ``rev`` still matches; False means someone else wrote first."""
+    db = _get_db()
+    update: Dict[str, Any] = {"$set": {**set_fields, "updated_at": datetime.utcnow()}, "$inc": {"rev": 1}}
+    if push_fields:
+        update["$push"] = {k: {"$each": v} for k, v in push_fields.items()}
+    res = db.quiz_sessions.update_one({"attempt_id": attempt_id, "rev": rev, "status": "active"}, update)
+    return res.matched_count == 1
+
+def end_quiz_session(attempt_id: str, status: str) -> None:
+    db = _get_db()
+    db.quiz_sessions.update_one(
+        {"attempt_id": attempt_id, "status": "active"},
+        {"$set": {"status": status, "updated_at": datetime.utcnow()}}
+    )
+
+# -------- Topics --------
+
+class _TopicCatalog:
+    """Topic list shared by all sessions in this process.
+
+    Entries live for ``ttl`` seconds; within that window the ``topics``
+    version stamp is re-read at most every ``check_interval`` seconds so
+    writes made by other replicas are picked up quickly.
+    """
+
+    def __init__(self, ttl: float, check_interval: float):
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._topics: Optional[List[Dict[str, str]]] = None
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._topics = None
+
+    def get(self, loader: Callable[[], List[Dict[str, str]]]) -> List[Dict[str, str]]:
+        with self._lock:
+            now = time.monotonic()
+            version = None
+            if self._topics is not None and now - self._loaded_at < self.ttl:
+                if now - self._checked_at < self.check_interval:
+                    self.hits += 1
+                    return self._topics
+                version = get_version("topics")
+                self._checked_at = now
+                if version == self._version:
+                    self.hits += 1
+                    return self._topics
+            self.misses += 1
+            self._version = get_version("topics") if version is None else version
+            self._topics = loader()
+            self._loaded_at = self._checked_at = now
+            return self._topics
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "version": self._version}
+
+
+_catalog = _TopicCatalog(_cache_cfg["topic_catalog_ttl_seconds"], _cache_cfg["topics_version_check_seconds"])
+on_change("topics", _catalog.invalidate)
+
+# Question documents are immutable and stored under a question-set key in
+# their "topic_id" field: the content hash of the revision they belong to
+# (for topics created before versioning, the topic's own UUID). A topic
+# points at its newest revision through "current_version" and keeps the
+# older ones in "versions" so quizzes started on them can finish.
+
+def hash_question(digest: Any, question: Dict[str, Any]) -> None:
+    """Feed one question into a revision's content hash (order matters)."""
+    digest.update(json.dumps(question, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+    digest.update(b"\n")
+
+def content_hash(questions: List[Dict[str, Any]]) -> str:
+    digest = hashlib.sha256()
+    for q in questions:
+        hash_question(digest, q)
+    return digest.hexdigest()
+
+def _question_docs(version: str, questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Ordinals are 1-based so they line up with the "From/To Question" range
+    return [{**q, "topic_id": version, "ordinal": i} for i, q in enumerate(questions, start=1)]
+
+def _point_topic(topic_name: str, version: str, question_count: int) -> str:
+    """Make ``version`` the current revision of ``topic_name``, creating the topic if needed."""
+    db = _get_db()
+    now = datetime.utcnow()
+    doc = db.topics.find_one_and_update(
+        {"topic_name": topic_name},
+        {"$set": {"current_version": version, "question_count": question_count, "updated_at": now},
+         "$addToSet": {"versions": version},
+         "$setOnInsert": {"topic_id": str(uuid.uuid4()), "created_at": now}},
+        projection={"_id": 0, "topic_id": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    _bump_version("topics")
+    return doc["topic_id"]
+
+def save_topic(topic_name: str, questions: List[Dict[str, Any]]) -> str:
+    """Store ``questions`` as a new revision of ``topic_name``; identical content is stored once."""
+    db = _get_db()
+    version = content_hash(questions)
+    if not db.topic_versions.find_one({"version": version, "status": "ready"}, {"_id": 1}):
+        try:
+            if questions:
+                db.questions.insert_many(_question_docs(version, questions), ordered=False)
+        except BulkWriteError as e:
+            # Same hash, same content: rows left by an earlier try can stay
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+        db.topic_versions.update_one(
+            {"version": version},
+            {"$set": {"status": "ready", "question_count": len(questions)},
+             "$setOnInsert": {"topic_name": topic_name, "created_at": datetime.utcnow()}},
+            upsert=True,
+        )
+    return _point_topic(topic_name, version, len(questions))
+
+def begin_topic_import(topic_name: str, version: str) -> Optional[int]:
+    """Start (or resume) writing revision ``version``; returns questions already written, or None if it exists."""
+    db = _get_db()
+    doc = db.topic_versions.find_one_and_update(
+        {"version": version},
+        {"$setOnInsert": {"status": "importing", "imported": 0, "topic_name": topic_name, "created_at": datetime.utcnow()}},
+        projection={"_id": 0, "status": 1, "imported": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc.get("status") == "ready":
+        return None
+    return doc.get("imported", 0)
+
+def write_topic_batch(version: str, batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+    """Insert ``(ordinal, question)`` pairs and advance the revision's resume point."""
+    if not batch:
+        return
+    db = _get_db()
+    docs = [{**q, "topic_id": version, "ordinal": ordinal} for ordinal, q in batch]
+    try:
+        db.questions.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        # A resumed import may re-send the last, partially written batch
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+    db.topic_versions.update_one({"version": version}, {"$max": {"imported": batch[-1][0]}})
+
+def finish_topic_import(topic_name: str, version: str, question_count: int) -> str:
+    db = _get_db()
+    db.topic_versions.update_one(
+        {"version": version},
+        {"$set": {"status": "ready", "question_count": question_count}, "$unset": {"imported": ""}}
+    )
+    return _point_topic(topic_name, version, question_count)
+
+def get_pending_imports() -> List[Dict[str, Any]]:
+    db = _get_db()
+    return list(db.topic_versions.find({"status": "importing"}, {"_id": 0, "version": 1, "topic_name": 1, "imported": 1}))
+
+def discard_import(version: str) -> bool:
+    db = _get_db()
+    res = db.topic_versions.delete_one({"version": version, "status": "importing"})
+    if res.deleted_count:
+        db.questions.delete_many({"topic_id": version})
+    return res.deleted_count == 1
+
+def _load_topics() -> List[Dict[str, str]]:
+    db = _get_db()
+    projection = {"_id": 0, "topic_id": 1, "topic_name": 1, "question_count": 1, "current_version": 1}
+    cursor = db.topics.find({}, projection).sort("topic_name", ASCENDING)
+    topics = list(cursor)
+    for t in topics:
+        t["version"] = t.pop("current_version", None) or t["topic_id"]
+    return topics
+
+def get_all_topics() -> List[Dict[str, str]]:
+    """Topics with their current question-set ``version`` (pass that to the question readers)."""
+    return [dict(t) for t in _catalog.get(_load_topics)]
+
+def get_topic_cache_stats() -> Dict[str, Any]:
+    return _catalog.stats()
+
+def _embedded_questions(topic_id: str) -> List[Dict[str, Any]]:
+    # Topics saved before the questions collection existed, until migrated
     db = _get_db()
     doc = db.topics.find_one({"topic_id": topic_id}, {"_id": 0, "questions": 1})
     return doc.get("questions", []) if doc else []
 
+def get_questions_by_ordinals(version: str, ordinals: List[int]) -> Dict[int, Dict[str, Any]]:
+    """The given questions of a revision keyed by ordinal, in one (topic_id, ordinal) index query."""
+    db = _get_db()
+    by_ordinal = {}
+    for doc in db.questions.find({"topic_id": version, "ordinal": {"$in": list(ordinals)}}, {"_id": 0, "topic_id": 0}):
+        by_ordinal[doc.pop("ordinal")] = doc
+    if by_ordinal:
+        return by_ordinal
+    embedded = _embedded_questions(version)
+    return {o: embedded[o - 1] for o in ordinals if 0 < o <= len(embedded)}
+
+# Revisions are immutable, so facets never go stale; the LRU bounds how many versions are kept
+_facets: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+_facets_lock = threading.Lock()
+
+def get_topic_facets(version: str) -> List[Dict[str, Any]]:
+    """Question counts per ``(category, difficulty)`` pair, answered from the facet index."""
+    with _facets_lock:
+        facets = _facets.get(version)
+        if facets is not None:
+            _facets.move_to_end(version)
+    if facets is None:
+        db = _get_db()
+        pipeline = [
+            {"$match": {"topic_id": version}},
+            {"$group": {"_id": {"category": "$category", "difficulty": "$difficulty"}, "count": {"$sum": 1}}},
+        ]
+        # $group leaves a field out of _id when the questions don't have it
+        facets = [
+            {"category": d["_id"].get("category"), "difficulty": d["_id"].get("difficulty"), "count": d["count"]}
+            for d in db.questions.aggregate(pipeline)
+        ]
+        if not facets:
+            counts: Dict[Tuple[Any, Any], int] = {}
+            for q in _embedded_questions(version):
+                key = (q.get("category"), q.get("difficulty"))
+                counts[key] = counts.get(key, 0) + 1
+            facets = [{"category": c, "difficulty": d, "count": n} for (c, d), n in counts.items()]
+        facets.sort(key=lambda f: (str(f["category"]), str(f["difficulty"])))
+        with _facets_lock:
+            _facets[version] = facets
+            _facets.move_to_end(version)
+            while len(_facets) > _cache_cfg["facet_cache_versions"]:
+                _facets.popitem(last=False)
+    return [dict(f) for f in facets]
+
+def _strata(limit: int, difficulty_mix: Optional[Dict[str, float]]) -> List[Tuple[Dict[str, Any], int]]:
+    """Split ``limit`` into ``(difficulty filter, count)`` pairs; unlisted difficulties share the rest.
+
+    Counts use largest-remainder rounding, and every non-zero share gets at
+    least one question while ``limit`` allows it.
+    """
+    if not difficulty_mix:
+        return [({}, limit)]
+    shares = [({"difficulty": d}, share) for d, share in difficulty_mix.items() if share > 0]
+    total = sum(share for _, share in shares)
+    if total < 0.999:
+        shares.append(({"difficulty": {"$nin": list(difficulty_mix)}}, 1.0 - total))
+        total = 1.0
+    if not shares:
+        return [({}, limit)]
+    exact = [limit * share / total for _, share in shares]
+    counts = [int(x) for x in exact]
+    by_remainder = sorted(range(len(shares)), key=lambda i: exact[i] - counts[i], reverse=True)
+    for i in by_remainder[:limit - sum(counts)]:
+        counts[i] += 1
+    for i in sorted(range(len(shares)), key=lambda i: shares[i][1], reverse=True):
+        donor = max(range(len(counts)), key=lambda j: counts[j])
+        if counts[i] == 0 and counts[donor] > 1:
+            counts[donor] -= 1
+            counts[i] = 1
+    return [(flt, n) for (flt, _), n in zip(shares, counts) if n > 0]
+
+def _question_match(topic_id: str, start: int, end: int, categories: Optional[List[str]]) -> Dict[str, Any]:
+    match: Dict[str, Any] = {"topic_id": topic_id, "ordinal": {"$gte": start, "$lte": end}}
+    if categories:
+        match["category"] = {"$in": list(categories)}
+    return match
+
+def _select_questions(match: Dict[str, Any], limit: int, randomize: bool, projection: Dict[str, int]) -> List[Dict[str, Any]]:
+    db = _get_db()
+    if randomize:
+        pipeline = [{"$match": match}, {"$sample": {"size": limit}}, {"$project": projection}]
+        return list(db.questions.aggregate(pipeline))
+    return list(db.questions.find(match, projection).sort("ordinal", ASCENDING).limit(limit))
+
+def _select_embedded(topic_id: str, start: int, end: int, limit: int, randomize: bool, categories: Optional[List[str]], difficulty_mix: Optional[Dict[str, float]]) -> List[Tuple[int, Dict[str, Any]]]:
+    numbered = list(enumerate(_embedded_questions(topic_id), start=1))[start - 1:end]
+    if categories:
+        numbered = [(i, q) for i, q in numbered if q.get("category") in categories]
+    selected = []
+    for flt, n in _strata(limit, difficulty_mix):
+        wanted = flt.get("difficulty")
+        if isinstance(wanted, dict):
+            pool = [(i, q) for i, q in numbered if q.get("difficulty") not in wanted["$nin"]]
+        elif wanted is not None:
+            pool = [(i, q) for i, q in numbered if q.get("difficulty") == wanted]
+        else:
+            pool = numbered
+        selected += random.sample(pool, min(n, len(pool))) if randomize else pool[:n]
+    return selected
+
+def _select_stratified(topic_id: str, start: int, end: int, limit: int, randomize: bool, categories: Optional[List[str]], difficulty_mix: Optional[Dict[str, float]], projection: Dict[str, int]) -> List[Dict[str, Any]]:
+    match = _question_match(topic_id, start, end, categories)
+    docs = []
+    for flt, n in _strata(limit, difficulty_mix):
+        docs += _select_questions({**match, **flt}, n, randomize, projection)
+    if randomize and len(docs) > 1:
+        random.shuffle(docs)
+    return docs
+
+def select_topic_ordinals(version: str, start: int, end: int, limit: int, randomize: bool = True, categories: Optional[List[str]] = None, difficulty_mix: Optional[Dict[str, float]] = None) -> List[int]:
+    """Ordinals of questions ``start..end`` (1-based, inclusive), at most ``limit``, sampled in Mongo.
+
+    ``categories`` restricts the pool; ``difficulty_mix`` maps a difficulty to
+    its share of ``limit`` (e.g. ``{"Hard": 0.5}``), the rest coming from the
+    other difficulties. A stratum with too few questions yields a shorter quiz.
+    Only the ordinals travel over the wire.
+    """
+    docs = _select_stratified(version, start, end, limit, randomize, categories, difficulty_mix, {"_id": 0, "ordinal": 1})
+    if docs:
+        ordinals = [d["ordinal"] for d in docs]
+        return ordinals if randomize else sorted(ordinals)
+
+    selected = _select_embedded(version, start, end, limit, randomize, categories, difficulty_mix)
+    ordinals = [i for i, _ in selected]
+    if randomize:
+        random.shuffle(ordinals)
+    else:
+        ordinals.sort()
+    return ordinals
+
+def migrate_embedded_questions() -> int:
+    """Move questions embedded in topic documents into the questions collection.
+
+    Safe to re-run: questions are upserted by (topic_id, ordinal) and the
+    embedded array is only removed once they are all written.
+    """
+    db = _get_db()
+    migrated = 0
+    for doc in db.topics.find({"questions": {"$exists": True}}, {"_id": 0, "topic_id": 1, "questions": 1}):
+        topic_id = doc["topic_id"]
+        questions = doc.get("questions") or []
+        ops = [
+            ReplaceOne({"topic_id": topic_id, "ordinal": q["ordinal"]}, q, upsert=True)
+            for q in _question_docs(topic_id, questions)
+        ]
+        if ops:
+            db.questions.bulk_write(ops, ordered=False)
+        db.topics.update_one(
+            {"topic_id": topic_id},
+            {"$set": {"question_count": len(questions)}, "$unset": {"questions": ""}}
+        )
+        migrated += 1
+    if migrated:
+        _bump_version("topics")
+    return migrated
+
 def delete_topic(topic_id: str) -> bool:
+    """Delete a topic and every revision of it that no other topic shares."""
     db = _get_db()
-    res = db.topics.delete_one({"topic_id": topic_id})
-    return res.deleted_count == 1
+    doc = db.topics.find_one_and_delete({"topic_id": topic_id}, projection={"_id": 0, "versions": 1})
+    if doc is None:
+        return False
+    # Topics created before versioning keep their questions under their own id
+    for version in set(doc.get("versions") or []) | {topic_id}:
+        if db.topics.find_one({"versions": version}, {"_id": 1}):
+            continue
+        db.questions.delete_many({"topic_id": version})
+        db.topic_versions.delete_one({"version": version})
+    db.item_stats.delete_many({"topic_id": topic_id})
+    db.meta.delete_one({"_id": f"item_stats_{topic_id}"})
+    _bump_version("topics")
+    return True
+
+# -------- Images --------
+
+def _image_bucket() -> gridfs.GridFSBucket:
+    return gridfs.GridFSBucket(_get_db(), bucket_name="images")
+
+def image_blob_exists(key: str) -> bool:
+    return _get_db()["images.files"].find_one({"filename": key}, {"_id": 1}) is not None
+
+def put_image_blob(key: str, data: bytes, content_type: str) -> None:
+    if not image_blob_exists(key):
+        _image_bucket().upload_from_stream(key, data, metadata={"content_type": content_type})
+
+def get_image_blob(key: str) -> Optional[bytes]:
+    try:
+        return _image_bucket().open_download_stream_by_name(key).read()
+    except gridfs.errors.NoFile:
+        return None
+
+def iter_questions_without_image_hash():
+    db = _get_db()
+    query = {"image": {"$nin": [None, ""]}, "image_hash": {"$exists": False}}
+    return db.questions.find(query, {"_id": 0, "topic_id": 1, "ordinal": 1, "image": 1})
+
+def set_question_image_hash(topic_id: str, ordinal: int, image_hash: str) -> None:
+    db = _get_db()
+    db.questions.update_one({"topic_id": topic_id, "ordinal": ordinal}, {"$set": {"image_hash": image_hash}})
+
+# -------- Uploads --------
+
+def _upload_bucket() -> gridfs.GridFSBucket:
+    return gridfs.GridFSBucket(_get_db(), bucket_name="uploads")
+
+def put_upload(filename: str, stream: Any) -> str:
+    """Park an uploaded file in GridFS so a worker process can read it; returns its id."""
+    return str(_upload_bucket().upload_from_stream(filename, stream))
+
+def open_upload(upload_id: str):
+    return _upload_bucket().open_download_stream(ObjectId(upload_id))
+
+def delete_upload(upload_id: str) -> None:
+    try:
+        _upload_bucket().delete(ObjectId(upload_id))
+    except gridfs.errors.NoFile:
+        pass
+
+# -------- Jobs --------
+
+def enqueue_job(kind: str, params: Dict[str, Any], idempotency_key: Optional[str] = None, max_attempts: int = 3) -> str:
+    """Queue a job; a second call with the same ``idempotency_key`` returns the first job's id.
+
+    The key only holds while that job is queued or running. Once it is done
+    or has failed for good, the key is released and a new job is queued.
+    """
+    db = _get_db()
+    now = datetime.utcnow()
+    doc = {
+        "job_id": str(uuid.uuid4()),
+        "kind": kind,
+        "params": params,
+        "status": "queued",
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "progress": {"done": 0, "total": 0, "message": ""},
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+        "run_after": now,
+        "lease_until": None,
+        "worker": None,
+    }
+    if idempotency_key:
+        doc["idempotency_key"] = idempotency_key
+    while True:
+        try:
+            db.jobs.insert_one(doc)
+            return doc["job_id"]
+        except DuplicateKeyError:
+            existing = db.jobs.find_one({"idempotency_key": idempotency_key}, {"job_id": 1, "status": 1})
+            if existing is None:
+                continue
+            if existing["status"] not in ("done", "failed"):
+                return existing["job_id"]
+            db.jobs.update_one({"job_id": existing["job_id"], "status": existing["status"]}, {"$unset": {"idempotency_key": ""}})
+
+def claim_job(worker: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+    """Lease the oldest runnable job; running jobs whose lease ran out are taken over."""
+    db = _get_db()
+    now = datetime.utcnow()
+    return db.jobs.find_one_and_update(
+        {"$or": [
+            {"status": "queued", "run_after": {"$lte": now}},
+            {"status": "running", "lease_until": {"$lt": now}},
+        ]},
+        {"$set": {"status": "running", "worker": worker, "lease_until": now + timedelta(seconds=lease_seconds), "updated_at": now},
+         "$inc": {"attempts": 1}},
+        sort=[("run_after", ASCENDING)],
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+
+def update_job_progress(job_id: str, worker: str, done: int, total: int, message: str, lease_seconds: float) -> bool:
+    """Record progress and extend the lease; False if another worker has taken the job over."""
+    db = _get_db()
+    now = datetime.utcnow()
+    res = db.jobs.update_one(
+        {"job_id": job_id, "worker": worker, "status": "running"},
+        {"$set": {
+            "progress": {"done": done, "total": total, "message": message},
+            "lease_until": now + timedelta(seconds=lease_seconds),
+            "updated_at": now,
+        }}
+    )
+    return res.matched_count == 1
+
+def complete_job(job_id: str, worker: str, result: Any) -> None:
+    db = _get_db()
+    db.jobs.update_one(
+        {"job_id": job_id, "worker": worker},
+        # The key only guards queued/running/failed work; a finished job frees it
+        {"$set": {"status": "done", "result": result, "error": None, "lease_until": None, "updated_at": datetime.utcnow()},
+         "$unset": {"idempotency_key": ""}}
+    )
+
+def fail_job(job_id: str, worker: str, error: str, retry_seconds: float) -> str:
+    """Requeue with exponential backoff, or mark failed once attempts are used up; returns the new status."""
+    db = _get_db()
+    job = db.jobs.find_one({"job_id": job_id, "worker": worker}, {"attempts": 1, "max_attempts": 1})
+    if job is None:
+        return "lost"
+    now = datetime.utcnow()
+    update: Dict[str, Any] = {"error": error, "lease_until": None, "updated_at": now}
+    if job["attempts"] < job["max_attempts"]:
+        update["status"] = "queued"
+        update["run_after"] = now + timedelta(seconds=retry_seconds * 2 ** (job["attempts"] - 1))
+    else:
+        update["status"] = "failed"
+    db.jobs.update_one({"job_id": job_id, "worker": worker}, {"$set": update})
+    return update["status"]
+
+def retry_job(job_id: str) -> bool:
+    """Put a failed job back in the queue with a fresh set of attempts."""
+    db = _get_db()
+    res = db.jobs.update_one(
+        {"job_id": job_id, "status": "failed"},
+        {"$set": {"status": "queued", "attempts": 0, "run_after": datetime.utcnow(), "error": None}}
+    )
+    return res.modified_count == 1
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    db = _get_db()
+    return db.jobs.find_one({"job_id": job_id}, {"_id": 0})
+
+def get_job_by_key(idempotency_key: str) -> Optional[Dict[str, Any]]:
+    db = _get_db()
+    return db.jobs.find_one({"idempotency_key": idempotency_key}, {"_id": 0, "job_id": 1, "status": 1, "params": 1})
+
+def get_recent_jobs(limit: int = 20) -> List[Dict[str, Any]]:
+    db = _get_db()
+    # Bulk reports can be large; fetch them with get_job when needed
+    projection = {"_id": 0, "result.report": 0}
+    return list(db.jobs.find({}, projection).sort("created_at", DESCENDING).limit(limit))
+
+# -------- Item statistics --------
+
+def claim_item_stats_window(topic_id: str, rebuild: bool = False, settle_seconds: int = 300) -> Optional[Tuple[str, Optional[datetime], datetime]]:
+    """Reserve the next ``(version, since, until)`` slice of a topic's finished attempts for item statistics.
+
+    The snapshot covers the topic's current revision only; once a new one
+    is published it starts over, as question ids may mean something else
+    there. Slices are cut on ``attempts.finished_at``, so an attempt and all
+    of its results land in exactly one slice. ``until`` trails the clock by
+    ``settle_seconds`` to give answers replayed from a result spool time to
+    arrive. Attempts never finished are left out.
+
+    The slice stays pending until ``commit_item_stats_window``; a refresh
+    that fails part-way gets the same slice back on its next try. Returns
+    None when there is nothing new or another refresh claimed the slice first.
+    """
+    db = _get_db()
+    topic = db.topics.find_one({"topic_id": topic_id}, {"_id": 0, "current_version": 1})
+    if topic is None:
+        return None
+    version = topic.get("current_version") or topic_id
+    now = datetime.utcnow()
+    until = now - timedelta(seconds=settle_seconds)
+    # BSON dates keep milliseconds; the slice must compare equal once stored
+    until = until.replace(microsecond=until.microsecond // 1000 * 1000)
+    key = f"item_stats_{topic_id}"
+    current = db.meta.find_one({"_id": key}, {"watermark": 1, "version": 1, "pending": 1}) or {}
+    pending = current.get("pending")
+    if pending and not rebuild and pending["version"] == version:
+        return version, pending["since"], pending["until"]
+    reset = rebuild or current.get("version") != version
+    since = None if reset else current.get("watermark")
+    if since is not None and until <= since:
+        return None
+
+    query = {"_id": key} if rebuild else {
+        "_id": key, "watermark": current.get("watermark"), "version": current.get("version"), "pending": pending,
+    }
+    try:
+        db.meta.update_one(
+            query, {"$set": {"pending": {"version": version, "since": since, "until": until}, "claimed_at": now}}, upsert=True
+        )
+    except DuplicateKeyError:
+        return None
+    if reset:
+        db.item_stats.delete_many({"topic_id": topic_id})
+    return version, since, until
+
+def commit_item_stats_window(topic_id: str, version: str, until: datetime) -> bool:
+    """Advance the watermark past a pending slice whose statistics are saved."""
+    db = _get_db()
+    res = db.meta.update_one(
+        {"_id": f"item_stats_{topic_id}", "pending.version": version, "pending.until": until},
+        {"$set": {"watermark": until, "version": version, "refreshed_at": datetime.utcnow()}, "$unset": {"pending": ""}},
+    )
+    return res.modified_count == 1
+
+def get_attempt_totals(topic_id: str, version: str, since: Optional[datetime], until: datetime) -> Dict[str, int]:
+    """``attempt_id -> total score`` of the attempts on ``version`` finished in ``[since, until)``."""
+    db = _get_db()
+    window: Dict[str, Any] = {"$lt": until}
+    if since is not None:
+        window["$gte"] = since
+    # Attempts from before revisions were recorded belong to the topic's original questions
+    versions = [version, None] if version == topic_id else [version]
+    query = {"topic_id": topic_id, "version": {"$in": versions}, "finished_at": window}
+    cursor = db.attempts.find(query, {"_id": 0, "attempt_id": 1, "score": 1})
+    return {d["attempt_id"]: d.get("score", 0) for d in cursor}
+
+def iter_attempt_results(attempt_ids: List[str], chunk_size: int = 50_000, ids_per_query: int = 1000):
+    """Yield lists of at most ``chunk_size`` slim result rows belonging to the given attempts."""
+    db = _get_db()
+    projection = {"_id": 0, "question_id": 1, "attempt_id": 1, "score": 1, "user_answers": 1, "elapsed_seconds": 1}
+    chunk = []
+    for start in range(0, len(attempt_ids), ids_per_query):
+        ids = attempt_ids[start:start + ids_per_query]
+        cursor = db.results.find({"attempt_id": {"$in": ids}}, projection).batch_size(min(chunk_size, 10_000))
+        for doc in cursor:
+            chunk.append(doc)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def get_item_stats(topic_id: str, version: str, question_ids: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+    db = _get_db()
+    query: Dict[str, Any] = {"topic_id": topic_id, "version": version}
+    if question_ids is not None:
+        query["question_id"] = {"$in": question_ids}
+    return list(db.item_stats.find(query, {"_id": 0}))
+
+def get_item_stats_status(topic_id: str) -> Dict[str, Any]:
+    db = _get_db()
+    return db.meta.find_one({"_id": f"item_stats_{topic_id}"}, {"_id": 0}) or {}
+
+def save_item_stats(topic_id: str, version: str, through: datetime, docs: List[Dict[str, Any]]) -> None:
+    """Store snapshot documents that include every attempt finished before ``through``."""
+    if not docs:
+        return
+    db = _get_db()
+    ops = [
+        ReplaceOne(
+            {"topic_id": topic_id, "question_id": d["question_id"]},
+            {**d, "topic_id": topic_id, "version": version, "through": through},
+            upsert=True,
+        )
+        for d in docs
+    ]
+    db.item_stats.bulk_write(ops, ordered=False)
+
+# -------- Migrations --------
+
+_TIMESTAMP_FIELDS = [
+    ("results", "timestamp"),
+    ("topics", "created_at"),
+    ("attempts", "started_at"),
+    ("attempts", "finished_at"),
+]
+
+def migrate_timestamps(batch_size: int = 1000) -> Dict[str, int]:
+    """Convert ISO-string timestamps to BSON dates in small batches.
+
+    Each batch is a short server-side update, so the app can keep running
+    while this works through a large collection.
+    """
+    db = _get_db()
+    converted = {}
+    for collection, field in _TIMESTAMP_FIELDS:
+        coll = db[collection]
+        total = 0
+        while True:
+            ids = [d["_id"] for d in coll.find({field: {"$type": "string"}}, {"_id": 1}).limit(batch_size)]
+            if not ids:
+                break
+            res = coll.update_many(
+                {"_id": {"$in": ids}, field: {"$type": "string"}},
+                [{"$set": {field: {"$dateFromString": {"dateString": f"${field}", "timezone": "UTC"}}}}]
+            )
+            total += res.modified_count
+        converted[f"{collection}.{field}"] = total
+    return converted
+
+def migrate_emails() -> Dict[str, Any]:
+    """Lowercase stored user emails so those accounts can log in.
+
+    Results, attempts and sessions were always written under the email the
+    login form lowercased, so only ``users`` needs it. An account whose
+    lowercased email already belongs to another one is left alone and
+    reported under ``conflicts`` for an admin to merge or delete.
+    """
+    db = _get_db()
+    updated, conflicts = 0, []
+    for doc in db.users.find({"email": {"$regex": r"[A-Z]|^\s|\s$"}}, {"email": 1}):
+        try:
+            updated += db.users.update_one({"_id": doc["_id"]}, {"$set": {"email": normalize_email(doc["email"])}}).modified_count
+        except DuplicateKeyError:
+            conflicts.append(doc["email"])
+    if updated:
+        _bump_version("users")
+    return {"updated": updated, "conflicts": conflicts}
 
 # -------- Validation --------
 
-def validate_questions(questions: Any) -> List[str]:
-    issues = []
-    if not isinstance(questions, list):
-        return ["Root must be a list of questions."]
-    for i, q in enumerate(questions, start=1):
-        if not isinstance(q, dict):
-            issues.append(f"Q{i}: must be an object.")
-            continue
-        for field in ["id", "text", "options", "correct", "type", "points"]:
-            if field not in q:
-                issues.append(f"Q{i}: missing '{field}'.")
-        if "options" in q and not isinstance(q["options"], dict):
-            issues.append(f"Q{i}: 'options' must be an object.")
-        if "correct" in q and not isinstance(q["correct"], list):
-            issues.append(f"Q{i}: 'correct' must be a list of labels.")
-        if "image" in q and q["image"] and not isinstance(q["image"], str):
-            issues.append(f"Q{i}: 'image' must be a string URL if present.")
-        if "category" in q and q["category"] and not isinstance(q["category"], str):
-            issues.append(f"Q{i}: 'category' must be a string if present.")
-        if "difficulty" in q and q["difficulty"] and not isinstance(q["difficulty"], str):
-            issues.append(f"Q{i}: 'difficulty' must be a string if present.")
-    return issues
+def validate_questions(questions: Any, max_issues: Optional[int] = None) -> List[str]:
+    return ValidationEngine(max_issues=max_issues).validate(questions)
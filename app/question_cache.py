@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import cache_config
+from mongo_storage import get_questions_by_ordinals
+
+
+class Question:
+    """Read-only question shared by every session that quizzes on its topic."""
+
+    __slots__ = (
+        "ordinal", "id", "text", "option_keys", "option_texts", "correct",
+        "type", "points", "image", "image_hash", "category", "difficulty",
+    )
+
+    def __init__(self, ordinal: int, doc: Dict[str, Any]):
+        options = doc.get("options", {})
+        self.ordinal = ordinal
+        self.id = doc.get("id", ordinal)
+        self.text = doc.get("text", "")
+        self.option_keys: Tuple[str, ...] = tuple(options.keys())
+        self.option_texts: Tuple[str, ...] = tuple(options.values())
+        self.correct: Tuple[str, ...] = tuple(doc.get("correct", []))
+        self.type = doc.get("type", "single")
+        self.points = doc.get("points", len(self.correct))
+        self.image = doc.get("image")
+        self.image_hash = doc.get("image_hash")
+        self.category = doc.get("category")
+        self.difficulty = doc.get("difficulty")
+
+    def options_view(self, perm: bytes) -> List[Tuple[str, str, str]]:
+        """``(display_label, original_key, text)`` for the session's option order."""
+        return [(chr(65 + i), self.option_keys[j], self.option_texts[j]) for i, j in enumerate(perm)]
+
+
+class QuestionCache:
+    """Process-wide LRU of ``(version, ordinal) -> Question``.
+
+    Only questions a quiz actually drew are loaded, the missing ones of a
+    request in a single ``$in`` query. Loads for one version run one at a
+    time, so sessions starting together on a cold revision wait for the
+    first load and then fetch only what it didn't cover. Memory is bounded
+    by ``max_questions``, not by bank size. Revisions are immutable, so an
+    entry never goes stale.
+    """
+
+    def __init__(self, max_questions: int, load_stripes: int = 16):
+        self.max_questions = max_questions
+        self._items: "OrderedDict[Tuple[str, int], Question]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Striped so the lock count stays fixed however many versions pass through
+        self._load_locks = [threading.Lock() for _ in range(load_stripes)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def _lookup(self, version: str, ordinals: Iterable[int]) -> Dict[int, Question]:
+        found = {}
+        with self._lock:
+            for o in ordinals:
+                q = self._items.get((version, o))
+                if q is not None:
+                    self._items.move_to_end((version, o))
+                    found[o] = q
+        return found
+
+    def get_many(self, version: str, ordinals: Sequence[int]) -> List[Optional[Question]]:
+        found = self._lookup(version, ordinals)
+        missing = [o for o in dict.fromkeys(ordinals) if o not in found]
+        if missing:
+            with self._load_locks[hash(version) % len(self._load_locks)]:
+                # Another session may have loaded them while this one waited
+                found.update(self._lookup(version, missing))
+                missing = [o for o in missing if o not in found]
+                if missing:
+                    loaded = {o: Question(o, doc) for o, doc in get_questions_by_ordinals(version, missing).items()}
+                    with self._lock:
+                        for o, q in loaded.items():
+                            self._items[(version, o)] = q
+                        while len(self._items) > self.max_questions:
+                            self._items.popitem(last=False)
+                    found.update(loaded)
+        return [found.get(o) for o in ordinals]
+
+    def get(self, version: str, ordinal: int) -> Optional[Question]:
+        return self.get_many(version, [ordinal])[0]
+
+
+_cache = QuestionCache(cache_config()["question_cache_questions"])
+
+
+def get_question_cache() -> QuestionCache:
+    return _cache
@@ -0,0 +1,156 @@
+import codecs
+import hashlib
+import json
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from image_store import ingest_image
+from validation import ValidationEngine
+from mongo_storage import (
+    begin_topic_import,
+    finish_topic_import,
+    hash_question,
+    write_topic_batch,
+)
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+def iter_json_array(stream: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array without loading the whole document."""
+    utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+    buf = ""
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buf, eof
+        if eof:
+            return False
+        chunk = stream.read(chunk_size)
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        eof = not chunk
+        buf += utf8.decode(chunk, final=eof)
+        return True
+
+    pos = 0
+    count = 0
+    # What may come next: the opening "[", a question or "]" (first),
+    # a question (after ","), "," or "]" (sep), or nothing but whitespace (end)
+    expect = "["
+    while True:
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        if pos == len(buf):
+            buf, pos = "", 0
+            if not fill():
+                if expect == "end":
+                    return
+                raise ValueError("Unexpected end of file: the question list is not closed.")
+            continue
+        char = buf[pos]
+        if expect == "[":
+            if char != "[":
+                raise ValueError("Root must be a list of questions.")
+            expect = "first"
+            pos += 1
+            continue
+        if expect == "end":
+            raise ValueError("Unexpected content after the end of the question list.")
+        if expect == "sep":
+            if char not in ",]":
+                raise ValueError(f"Expected ',' or ']' after question {count}.")
+            expect = "value" if char == "," else "end"
+            pos += 1
+            continue
+        if char == "]":
+            if expect == "value":
+                raise ValueError(f"Expected a question after question {count} and ','.")
+            expect = "end"
+            pos += 1
+            continue
+        try:
+            value, end = _decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Most likely an element split across chunks; read more and retry
+            buf, pos = buf[pos:], 0
+            if not fill():
+                raise
+            continue
+        if end == len(buf) and not eof:
+            # A number at the end of the buffer may continue in the next chunk
+            buf, pos = buf[pos:], 0
+            fill()
+            continue
+        yield value
+        count += 1
+        pos = end
+        expect = "sep"
+
+
+def normalize_question(q: Dict[str, Any]) -> Dict[str, Any]:
+    q.setdefault("category", "Uncategorized")
+    q.setdefault("difficulty", "Unknown")
+    if q.get("image") and not q.get("image_hash"):
+        image_hash = ingest_image(q["image"])
+        if image_hash:
+            q["image_hash"] = image_hash
+    return q
+
+
+def validate_stream(stream: BinaryIO, max_issues: int = 50) -> Tuple[int, List[str], str]:
+    """First pass: count, validate and content-hash questions one at a time."""
+    engine = ValidationEngine(max_issues=max_issues)
+    digest = hashlib.sha256()
+    count = 0
+    try:
+        for count, q in enumerate(iter_json_array(stream), start=1):
+            if not engine.feed(count, q):
+                return count, engine.issues + ["Too many issues; stopped checking."], ""
+            hash_question(digest, q)
+    except ValueError as e:
+        return count, engine.issues + [str(e)], ""
+    return count, engine.issues, digest.hexdigest()
+
+
+def import_topic_stream(
+    topic_name: str,
+    stream: BinaryIO,
+    batch_size: int = 1000,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[Optional[str], List[str]]:
+    """Validate, then write a question bank in bounded batches as a new topic revision.
+
+    Memory stays at one batch regardless of file size. The revision is keyed
+    by the file's content hash: importing the same file again after a
+    failure resumes after the last written batch, and a file whose content
+    is already stored just becomes the topic's current revision.
+    Returns ``(topic_id, issues)``; ``topic_id`` is None if validation failed.
+    """
+    total, issues, version = validate_stream(stream)
+    if issues:
+        return None, issues
+
+    imported = begin_topic_import(topic_name, version)
+    if imported is None:
+        topic_id = finish_topic_import(topic_name, version, total)
+        if progress:
+            progress(total, total)
+        return topic_id, []
+
+    stream.seek(0)
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    for ordinal, q in enumerate(iter_json_array(stream), start=1):
+        if ordinal <= imported:
+            continue
+        batch.append((ordinal, normalize_question(q)))
+        if len(batch) >= batch_size:
+            write_topic_batch(version, batch)
+            batch = []
+            if progress:
+                progress(ordinal, total)
+    write_topic_batch(version, batch)
+    topic_id = finish_topic_import(topic_name, version, total)
+    if progress:
+        progress(total, total)
+    return topic_id, []
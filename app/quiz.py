@@ -1,72 +1,210 @@
 import streamlit as st
 import random
 import time
+from array import array
+from functools import partial
+from pymongo.errors import PyMongoError
 from streamlit_autorefresh import st_autorefresh
+from result_writer import get_result_writer
+from image_store import get_image
+from question_cache import get_question_cache
+from instrumentation import phase, quiz_reruns, quiz_seconds
+from review import build_review
+from quiz_state import diff, fingerprint, get_session_backend, restore, snapshot
+from exam_mode import build_payload, exam_token, grace_seconds, render_exam, score_submission, verify_token
 from mongo_storage import (
-    save_result_mongo,
+    build_result,
+    create_attempt,
+    finalize_attempt,
     get_all_topics,
-    get_topic_questions,
+    get_topic_facets,
+    save_results,
+    select_topic_ordinals,
 )
 
+class TopicRemoved(Exception):
+    """The topic revision a quiz is pinned to was deleted while it ran."""
+
+
 class QuizApp:
     def __init__(self, config):
         self.duration_minutes = config["duration_minutes"]
         self.num_questions = config["num_questions"]
+        self.timer_mode = config.get("timer_mode", "fragment")
         self.randomize = True
+        self.categories = []
+        self.difficulty_mix = {}
         self.questions = []
         self.training_mode = False
+        self.sessions = get_session_backend()
         self.init_state()
 
-    def load_questions_topic(self, topic_id: str):
-        return get_topic_questions(topic_id)
-
     def init_state(self):
         defaults = {
             "started": False,
             "index": 0,
             "score": 0,
             "answers": [],
-            "quiz_questions": [],
+            "quiz_topic_id": None,
+            "quiz_version": None,
+            "quiz_ordinals": array("I"),
+            "option_perms": {},
             "start_time": None,
             "end_time": None,
-            "shuffled_options": {},
-            "key_maps": {},
             "feedback": "",
             "selected_topic_id": None,
+            "selected_version": None,
             "training_mode": False,
+            "exam_mode": False,
             "last_index": -1,
+            "attempt_id": None,
+            "review": None,
+            "question_shown_at": None,
+            "persisted": None,
+            "resume_checked": False,
         }
         for k, v in defaults.items():
             st.session_state.setdefault(k, v)
 
-    def shuffle_options(self, options):
-        items = list(options.items())
-        random.shuffle(items)
-        shuffled = {chr(65 + i): val for i, (_, val) in enumerate(items)}
-        key_map = {chr(65 + i): orig_key for i, (orig_key, _) in enumerate(items)}
-        return shuffled, key_map
+    def shuffle_options(self, num_options):
+        return bytes(random.sample(range(num_options), num_options))
+
+    def question_at(self, index):
+        ordinal = st.session_state.quiz_ordinals[index]
+        # Pinned to the revision the quiz started on, even if a newer one is uploaded
+        q = get_question_cache().get(st.session_state.quiz_version, ordinal)
+        if q is None:
+            raise TopicRemoved(st.session_state.quiz_version)
+        return q
+
+    def quiz_questions(self):
+        # One query for whatever the shared cache is missing, instead of one per question
+        questions = get_question_cache().get_many(st.session_state.quiz_version, st.session_state.quiz_ordinals)
+        if None in questions:
+            raise TopicRemoved(st.session_state.quiz_version)
+        return questions
+
+    def quiz_length(self):
+        return len(st.session_state.quiz_ordinals)
+
+    def option_perm(self, index, q):
+        perms = st.session_state.option_perms
+        if index not in perms:
+            perms[index] = self.shuffle_options(len(q.option_keys))
+        return perms[index]
 
     def start_quiz(self):
         st.session_state.started = True
         st.session_state.index = 0
         st.session_state.score = 0
         st.session_state.answers = []
-        st.session_state.shuffled_options = {}
-        st.session_state.key_maps = {}
+        st.session_state.option_perms = {}
+        st.session_state.review = None
         st.session_state.feedback = ""
         st.session_state.last_index = -1
         self.training_mode = st.session_state.get("training_mode", False)
+        st.session_state.exam_mode = st.session_state.get("exam_mode_choice", False)
 
         topic_id = st.session_state.selected_topic_id
-        self.questions = self.load_questions_topic(topic_id)
-
-        selected_questions = self.questions[self.start_question-1:self.end_question]
-        if self.randomize:
-            random.shuffle(selected_questions)
-
-        st.session_state.quiz_questions = selected_questions[:self.num_questions]
+        st.session_state.quiz_topic_id = topic_id
+        st.session_state.quiz_version = st.session_state.selected_version
+        st.session_state.quiz_ordinals = array("I", select_topic_ordinals(
+            st.session_state.quiz_version,
+            self.start_question,
+            self.end_question,
+            self.num_questions,
+            self.randomize,
+            categories=self.categories,
+            difficulty_mix=self.difficulty_mix,
+        ))
+        questions = self.quiz_questions()
+        if st.session_state.exam_mode:
+            # The browser gets every question up front, so fix all shuffles now
+            for i, q in enumerate(questions):
+                self.option_perm(i, q)
         st.session_state.start_time = time.time()
         st.session_state.end_time = st.session_state.start_time + self.duration_minutes * 60
+        st.session_state.attempt_id = create_attempt(
+            email=st.session_state.email,
+            topic_id=topic_id,
+            question_ids=[q.id for q in questions],
+            max_points=sum(q.points for q in questions),
+            duration_seconds=self.duration_minutes * 60,
+            version=st.session_state.quiz_version,
+        )
+        state = snapshot(st.session_state)
+        self.sessions.create({**state, "attempt_id": st.session_state.attempt_id, "email": st.session_state.email, "rev": 0})
+        st.session_state.persisted = {**fingerprint(state), "rev": 0}
+
+    def save_progress(self):
+        """Write what changed since the last save; False if another replica or tab got there first.
+
+        If the write fails, the quiz carries on from local state and the next
+        save sends everything changed since the last one that succeeded.
+        """
+        old = st.session_state.persisted
+        new = snapshot(st.session_state)
+        set_fields, push_fields = diff(old, new)
+        if not set_fields and not push_fields:
+            return True
+        try:
+            if not self.sessions.update(st.session_state.attempt_id, old["rev"], set_fields, push_fields):
+                return False
+        except PyMongoError as e:
+            print(f"⚠️ Could not save quiz progress for attempt {st.session_state.attempt_id}, will retry: {e}")
+            return True
+        st.session_state.persisted = {**fingerprint(new), "rev": old["rev"] + 1}
+        return True
+
+    def reload_after_conflict(self):
+        """Adopt the stored state after another window wrote first."""
+        doc = self.sessions.load_active(st.session_state.email)
+        if doc and doc["attempt_id"] == st.session_state.attempt_id:
+            self.resume_quiz(doc)
+            st.session_state.feedback = "⚠️ This quiz moved on in another window; continuing from there."
+        else:
+            st.session_state.started = False
+            st.session_state.attempt_id = None
+
+    def resume_quiz(self, doc):
+        restore(doc, st.session_state)
+        st.session_state.attempt_id = doc["attempt_id"]
+        st.session_state.persisted = {**fingerprint(snapshot(st.session_state)), "rev": doc["rev"]}
+        st.session_state.started = True
+        st.session_state.review = None
+        st.session_state.feedback = ""
+        st.session_state.last_index = -1
+        self.training_mode = st.session_state.training_mode
+
+    def check_resume(self):
+        """Once per browser session, pick up a quiz left running on any replica."""
+        if st.session_state.resume_checked or st.session_state.started:
+            return
+        st.session_state.resume_checked = True
+        doc = self.sessions.load_active(st.session_state.email)
+        if not doc:
+            return
+        if doc["end_time"] > time.time():
+            self.resume_quiz(doc)
+            st.info("🔄 Resumed your quiz in progress.")
+        else:
+            finalize_attempt(doc["attempt_id"], doc["end_time"] - doc["start_time"], "timed_out")
+            self.sessions.end(doc["attempt_id"], "timed_out")
+
+    def finish_attempt(self, status):
+        get_result_writer().flush()
+        if st.session_state.attempt_id:
+            finalize_attempt(st.session_state.attempt_id, time.time() - st.session_state.start_time, status)
+            self.sessions.end(st.session_state.attempt_id, status)
+            st.session_state.attempt_id = None
+
+    def end_removed_quiz(self):
+        """Close an attempt whose questions are gone, so it isn't resumed again."""
+        self.finish_attempt("topic_removed")
+        self.record_quiz_time()
+        st.session_state.started = False
+        st.session_state.review = None
+        st.error("🗑️ This quiz's topic was removed, so the attempt has ended.")
 
     def get_time_remaining(self):
         end = st.session_state.get("end_time")
@@ -74,10 +212,32 @@ class QuizApp:
             return 0
         return max(0, int(end - time.time()))
 
-    def render_settings(self):
+    def render_timer(self):
+        remaining = self.get_time_remaining()
+        minutes, seconds = divmod(remaining, 60)
+        st.markdown(f"⏳ **Time Remaining:** {minutes:02d}:{seconds:02d}")
+        total_time = max(1, int(st.session_state.end_time - st.session_state.start_time))
+        st.progress(min(1.0, remaining / total_time))
+
+    def rerun_mode(self):
+        # Exam mode keeps its countdown in the browser, so it has no ticks of its own
+        return "exam" if st.session_state.exam_mode else self.timer_mode
+
+    def _timer_tick(self):
+        quiz_reruns.inc((self.timer_mode, "timer_tick"))
+        with phase("quiz_timer"):
+            self.render_timer()
+        if self.get_time_remaining() == 0:
+            # Hand expiry back to a full rerun so run() can close the quiz
+            st.rerun()
+
+    def record_quiz_time(self):
+        quiz_seconds.inc((self.rerun_mode(),), max(0.0, time.time() - st.session_state.start_time))
+
+    def render_settings(self, topics=None):
         st.sidebar.header("⚙️ Quiz Settings")
 
-        topics = get_all_topics()
+        topics = get_all_topics() if topics is None else topics
         if not topics:
             st.sidebar.warning("🚫 No quizzes available. Please upload a question set in the Admin panel.")
             return
@@ -87,62 +247,108 @@ class QuizApp:
         selected_name = st.sidebar.selectbox("Topic", topic_names, index=0)
         selected_topic_id = options.get(selected_name)
         st.session_state.selected_topic_id = selected_topic_id
-        st.write(f"Available Questions: {self.num_questions}")
+        versions = {t["topic_id"]: t["version"] for t in topics}
+        st.session_state.selected_version = versions.get(selected_topic_id)
+        counts = {t["topic_id"]: t.get("question_count") for t in topics}
+        available = counts.get(selected_topic_id) or self.num_questions
+        st.write(f"Available Questions: {available}")
         self.start_question=1
-        self.end_question=self.num_questions
+        self.end_question=available
         self.start_question = st.sidebar.number_input("From Question", value=1,min_value=1,max_value=self.end_question)
-        self.end_question = st.sidebar.number_input("To Question", value=self.num_questions,min_value=self.start_question,max_value=self.num_questions)
+        self.end_question = st.sidebar.number_input("To Question", value=available,min_value=self.start_question,max_value=available)
         st.sidebar.write(f"Range selected: {self.start_question} to {self.end_question}")
         self.available_questions=self.end_question-self.start_question+1
+        mix_ok = self.render_filters(st.session_state.selected_version)
 
-        self.num_questions = st.sidebar.number_input("Number of questions", 1, 1000, self.available_questions)
+        self.num_questions = st.sidebar.number_input("Number of questions", 1, 1000, min(1000, self.available_questions))
         self.randomize = st.sidebar.checkbox("Randomize question order", value=True)
         st.session_state.training_mode = st.sidebar.checkbox("Training mode (show correct answers)", value=False)
+        st.session_state.exam_mode_choice = st.sidebar.checkbox(
+            "📝 Exam mode (answer in the browser, submit once)", value=False, disabled=st.session_state.training_mode
+        ) and not st.session_state.training_mode
         self.duration_minutes = st.sidebar.number_input("Quiz duration (minutes)", 1, 360, self.duration_minutes)
 
-        if selected_topic_id:
+        if selected_topic_id and not mix_ok:
+            st.sidebar.button("Start Quiz", disabled=True)
+            st.sidebar.error("Difficulty shares add up to more than 100%.")
+        elif selected_topic_id:
             if st.sidebar.button("Start Quiz"):
-                self.start_quiz()
+                with phase("quiz_start"):
+                    try:
+                        self.start_quiz()
+                    except TopicRemoved:
+                        self.end_removed_quiz()
         else:
             st.sidebar.button("Start Quiz", disabled=True)
             st.sidebar.info("Please select a topic to begin.")
 
+    def render_filters(self, version):
+        """Category filter and difficulty mix; returns False if the mix is impossible."""
+        self.categories, self.difficulty_mix = [], {}
+        facets = get_topic_facets(version) if version else []
+        if not facets:
+            return True
+
+        by_category = {}
+        for f in facets:
+            by_category[f["category"]] = by_category.get(f["category"], 0) + f["count"]
+        self.categories = st.sidebar.multiselect(
+            "Categories (all if empty)",
+            list(by_category),
+            format_func=lambda c: f"{c} ({by_category[c]})",
+        )
+
+        by_difficulty = {}
+        for f in facets:
+            if not self.categories or f["category"] in self.categories:
+                by_difficulty[f["difficulty"]] = by_difficulty.get(f["difficulty"], 0) + f["count"]
+        if self.categories:
+            self.available_questions = min(self.available_questions, sum(by_difficulty.values()))
+
+        with st.sidebar.expander("🎯 Difficulty mix"):
+            st.caption("Share of the quiz per difficulty; the rest is drawn from the others.")
+            for difficulty, count in by_difficulty.items():
+                share = st.slider(f"{difficulty} ({count} available)", 0, 100, 0, 5, key=f"mix_{difficulty}")
+                if share:
+                    self.difficulty_mix[difficulty] = share / 100
+        return sum(self.difficulty_mix.values()) <= 1.0 + 1e-9
+
     def render_question(self):
         if st.session_state.index != st.session_state.last_index:
             st.session_state.last_index = st.session_state.index
+            st.session_state.question_shown_at = time.time()
             for k in list(st.session_state.keys()):
                 if k.startswith("show_"):
                     del st.session_state[k]
 
-        remaining = self.get_time_remaining()
-        minutes, seconds = divmod(remaining, 60)
-        st.markdown(f"⏳ **Time Remaining:** {minutes:02d}:{seconds:02d}")
-        total_time = max(1, self.duration_minutes * 60)
-        st.progress(min(1.0, remaining / total_time))
-        st.markdown(f"📘 You’ve answered {st.session_state.index} of {len(st.session_state.quiz_questions)} questions")
+        if self.timer_mode == "fragment":
+            st.fragment(self._timer_tick, run_every=1)()
+        else:
+            # Every autorefresh rerun is a timer tick too
+            quiz_reruns.inc((self.timer_mode, "timer_tick"))
+            with phase("quiz_timer"):
+                self.render_timer()
+        st.markdown(f"📘 You’ve answered {st.session_state.index} of {self.quiz_length()} questions")
 
         if st.session_state.feedback:
             st.success(st.session_state.feedback) if "✅" in st.session_state.feedback else st.error(st.session_state.feedback)
 
-        q = st.session_state.quiz_questions[st.session_state.index]
-        qid = q.get("id", st.session_state.index + 1)
+        q = self.question_at(st.session_state.index)
+        qid = q.id
 
         st.header(f"Question {qid}")
-        st.write(q["text"])
+        st.write(q.text)
 
-        if q.get("image"):
-            st.image(q["image"], caption=f"Image for Question {qid}", use_column_width=True)
+        if q.image_hash or q.image:
+            image = get_image(q.image_hash) if q.image_hash else None
+            st.image(image or q.image, caption=f"Image for Question {qid}", use_column_width=True)
 
-        if qid not in st.session_state.shuffled_options:
-            shuffled, key_map = self.shuffle_options(q["options"])
-            st.session_state.shuffled_options[qid] = shuffled
-            st.session_state.key_maps[qid] = key_map
-
-        shuffled = st.session_state.shuffled_options[qid]
-        key_map = st.session_state.key_maps[qid]
+        view = q.options_view(self.option_perm(st.session_state.index, q))
+        shuffled = {label: text for label, _, text in view}
+        key_map = {label: key for label, key, _ in view}
         display_options = {k: f"{k}. {v}" for k, v in shuffled.items()}
 
-        if q["type"] == "single":
+        if q.type == "single":
             selected = st.radio("Choose one:", list(display_options.values()), key=f"q{st.session_state.index}")
             selected_key = selected.split(".")[0] if selected else None
             user_answers = [key_map[selected_key]] if selected_key else []
@@ -160,92 +366,168 @@ class QuizApp:
             st.session_state.show_answers=st.checkbox("👁️ Show correct answers", value=st.session_state.show_answers)
 
         if self.training_mode and st.session_state.show_answers:
-            correct = q["correct"]
+            correct = q.correct
             correct_keys = [k for k, v in key_map.items() if v in correct]
             correct_texts = [f"{k}. {shuffled[k]}" for k in correct_keys]
             st.info(f"🎯 Correct answer(s): {', '.join(correct_texts)}")
 
         if st.button("Submit Answer"):
-            correct = q["correct"]
-            gained = q.get("points", len(correct)) if set(user_answers) == set(correct) else 0
+            if self.get_time_remaining() == 0:
+                # The countdown may not have caught up yet; expiry is decided here
+                st.rerun()
+
+            correct = list(q.correct)
+            gained = q.points if set(user_answers) == set(correct) else 0
+
+            st.session_state.score += gained
+            # Question content lives in the shared cache; keep only what the user chose
+            st.session_state.answers.append((st.session_state.index, tuple(user_answers), gained))
+            st.session_state.index += 1
+            if not self.save_progress():
+                self.reload_after_conflict()
+                st.rerun()
 
-            save_result_mongo(
+            get_result_writer().submit(build_result(
                 email=st.session_state.email,
                 question_id=qid,
                 user_answers=user_answers,
                 correct_answers=correct,
                 score=gained,
-                topic_id=st.session_state.get("selected_topic_id"),
-            )
-
-            st.session_state.score += gained
+                topic_id=st.session_state.quiz_topic_id,
+                attempt_id=st.session_state.attempt_id,
+                elapsed_seconds=time.time() - (st.session_state.question_shown_at or time.time()),
+            ))
             st.session_state.feedback = "✅ Correct!" if gained > 0 else "❌ Incorrect."
+            st.rerun()
 
-            st.session_state.answers.append({
-                "question_id": qid,
-                "user": user_answers,
-                "correct": correct,
-            })
+    def render_exam(self):
+        questions = self.quiz_questions()
+        token = exam_token(
+            st.session_state.attempt_id,
+            st.session_state.email,
+            st.session_state.quiz_ordinals,
+            st.session_state.end_time,
+        )
+        payload = build_payload(questions, st.session_state.option_perms, token, st.session_state.end_time)
+        submission = render_exam(payload, key=f"exam_{st.session_state.attempt_id}")
+        if not submission:
+            return
+        if not verify_token(submission.get("token"), token):
+            st.error("🚫 This submission doesn't belong to the current exam.")
+            return
 
-            st.session_state.index += 1
-            time.sleep(0.3)
+        duration = st.session_state.end_time - st.session_state.start_time
+        scored = score_submission(questions, st.session_state.option_perms, submission, duration)
+        st.session_state.answers = [(i, tuple(user_keys), gained) for i, user_keys, gained, _ in scored]
+        st.session_state.score = sum(gained for _, _, gained, _ in scored)
+        st.session_state.index = self.quiz_length()
+        if not self.save_progress():
+            # Already submitted from another window; don't record it twice
+            self.reload_after_conflict()
             st.rerun()
 
-    def render_results(self):
-        st.success("🏁 Quiz complete!")
-        total_points = sum(q.get("points", len(q.get("correct", []))) for q in st.session_state.quiz_questions)
-        st.write(f"Your score: {st.session_state.score} / {total_points}")
-        st.write("📊 Answer Summary:")
-        st.json(st.session_state.answers)
-
-        incorrect = [a for a in st.session_state.answers if set(a["user"]) != set(a["correct"])]
-        if incorrect:
-            st.markdown("## 🔍 Review Incorrect Answers")
-            for entry in incorrect:
-                qid = entry["question_id"]
-                q = next((qq for qq in st.session_state.quiz_questions if qq.get("id") == qid), None)
-                if not q:
-                    continue
+        # One bulk write for the whole exam instead of one insert per question
+        save_results([
+            build_result(
+                email=st.session_state.email,
+                question_id=questions[i].id,
+                user_answers=user_keys,
+                correct_answers=list(questions[i].correct),
+                score=gained,
+                topic_id=st.session_state.quiz_topic_id,
+                attempt_id=st.session_state.attempt_id,
+                elapsed_seconds=seconds,
+            )
+            for i, user_keys, gained, seconds in scored
+        ])
+        st.rerun()
 
-                st.markdown(f"### ❌ Question {qid}")
-                st.write(q["text"])
+    def render_results(self):
+        if st.session_state.review is None:
+            questions = self.quiz_questions()
+            st.session_state.review = build_review(
+                questions,
+                st.session_state.answers,
+                st.session_state.option_perms,
+                st.session_state.score,
+            )
+            self.finish_attempt("completed")
+            self.record_quiz_time()
+            st.session_state.started = False
+        self.render_review(st.session_state.review)
 
-                key_map = st.session_state.key_maps.get(qid, {})
-                shuffled = st.session_state.shuffled_options.get(qid, {})
-                correct_keys = [k for k, v in key_map.items() if v in entry["correct"]]
-                user_keys = [k for k, v in key_map.items() if v in entry["user"]]
+    def render_review(self, review, page_size=10):
+        st.success("🏁 Quiz complete!")
+        st.write(f"Your score: {review.score} / {review.total_points}")
+        st.write(f"📊 Answer Summary: {len(review.items) - len(review.incorrect)} correct, {len(review.incorrect)} incorrect")
 
-                correct_texts = [f"{k}. {shuffled.get(k, '')}" for k in correct_keys]
-                user_texts = [f"{k}. {shuffled.get(k, '')}" for k in user_keys]
+        col1, col2 = st.columns(2)
+        with col1:
+            # Built only when clicked, so no copy of the export sits in the session between reruns
+            st.download_button("⬇️ Download answers (CSV)", partial(review.export, "csv"), file_name="quiz_attempt.csv", mime="text/csv")
+        with col2:
+            st.download_button("⬇️ Download answers (JSON)", partial(review.export, "json"), file_name="quiz_attempt.json", mime="application/json")
 
-                st.markdown(f"**✅ Correct Answer(s):** {', '.join(correct_texts)}")
-                st.markdown(f"**🧠 Your Answer(s):** {', '.join(user_texts)}")
+        if review.incorrect:
+            st.markdown("## 🔍 Review Incorrect Answers")
+            pages = max(1, -(-len(review.incorrect) // page_size))
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="review_page")
+            for item in review.page(review.incorrect, page, page_size):
+                st.markdown(f"### ❌ Question {item.question_id}")
+                st.write(item.text)
+                st.markdown(f"**✅ Correct Answer(s):** {', '.join(item.correct_texts)}")
+                st.markdown(f"**🧠 Your Answer(s):** {', '.join(item.user_texts)}")
                 st.markdown("---")
 
-        st.session_state.started = False
+    def render_quiz(self):
+        quiz_reruns.inc((self.rerun_mode(), "full"))
+        in_progress = (
+            st.session_state.index < self.quiz_length()
+            and self.get_time_remaining() > 0
+        )
+        exam_open = (
+            st.session_state.exam_mode
+            and st.session_state.index < self.quiz_length()
+            and time.time() <= st.session_state.end_time + grace_seconds()
+        )
+        if in_progress and self.timer_mode == "autorefresh" and not st.session_state.exam_mode:
+            st_autorefresh(interval=1000, limit=None, key="quiz_timer")
+
+        if exam_open:
+            # The countdown runs in the browser; a late auto-submit still lands within the grace period
+            with phase("quiz_exam"):
+                self.render_exam()
+        elif self.get_time_remaining() == 0:
+            st.warning("⏱️ Time's up!")
+            self.finish_attempt("timed_out")
+            self.record_quiz_time()
+            st.session_state.started = False
+        elif st.session_state.index < self.quiz_length():
+            with phase("quiz_question"):
+                self.render_question()
+        else:
+            with phase("quiz_results"):
+                self.render_results()
 
     def run(self):
         st.title("🧠 Quiz Training")
 
-        topics = get_all_topics()
+        with phase("quiz_topics"):
+            topics = get_all_topics()
         if not topics:
             st.warning("🚫 No quizzes available. Please upload a question set in the Admin panel.")
             return
 
-        self.render_settings()
+        with phase("quiz_settings"):
+            self.render_settings(topics)
+        self.check_resume()
 
         if st.session_state.started:
-            in_progress = (
-                st.session_state.index < len(st.session_state.quiz_questions)
-                and self.get_time_remaining() > 0
-            )
-            if in_progress:
-                st_autorefresh(interval=1000, limit=None, key="quiz_timer")
-
-            if self.get_time_remaining() == 0:
-                st.warning("⏱️ Time's up!")
-                st.session_state.started = False
-            elif st.session_state.index < len(st.session_state.quiz_questions):
-                self.render_question()
-            else:
-                self.render_results()
\ No newline at end of file
+            try:
+                self.render_quiz()
+            except TopicRemoved:
+                self.end_removed_quiz()
+        elif st.session_state.review is not None:
+            # Keep the review on screen while the user pages through it
+            with phase("quiz_results"):
+                self.render_review(st.session_state.review)
\ No newline at end of file
@@ -0,0 +1,183 @@
+import copy
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import session_config
+from mongo_storage import (
+    create_quiz_session,
+    end_quiz_session,
+    get_active_quiz_session,
+    update_quiz_session,
+)
+
+# The compact quiz progress that must survive a reconnect or a different replica
+PERSISTED = (
+    "quiz_topic_id", "quiz_version", "quiz_ordinals", "option_perms", "index", "score",
+    "answers", "start_time", "end_time", "training_mode", "exam_mode",
+)
+
+
+def snapshot(session: Any) -> Dict[str, Any]:
+    """Storable copy of the persisted fields of ``st.session_state``."""
+    state = {k: session[k] for k in PERSISTED}
+    state["quiz_ordinals"] = list(state["quiz_ordinals"])
+    # Document keys must be strings
+    state["option_perms"] = {str(i): bytes(p) for i, p in state["option_perms"].items()}
+    state["answers"] = [[i, list(keys), gained] for i, keys, gained in state["answers"]]
+    return state
+
+
+def restore(doc: Dict[str, Any], session: Any) -> None:
+    session.quiz_topic_id = doc["quiz_topic_id"]
+    session.quiz_version = doc.get("quiz_version") or doc["quiz_topic_id"]
+    session.quiz_ordinals = array("I", doc["quiz_ordinals"])
+    session.option_perms = {int(i): bytes(p) for i, p in doc["option_perms"].items()}
+    session.answers = [(i, tuple(keys), gained) for i, keys, gained in doc["answers"]]
+    for k in ("index", "score", "start_time", "end_time", "training_mode"):
+        session[k] = doc[k]
+    session.exam_mode = doc.get("exam_mode", False)
+
+
+def _digest(value: Any) -> bytes:
+    return hashlib.blake2b(repr(value).encode("utf-8"), digest_size=8).digest()
+
+
+def _items(value: Any) -> Any:
+    return list(value.items()) if isinstance(value, dict) else value
+
+
+def fingerprint(state: Dict[str, Any]) -> Dict[str, Any]:
+    """What ``diff`` needs of a saved snapshot: a digest per field rather than a copy.
+
+    Lists and dicts also keep their length, so entries appended since (new
+    answers, new option perms) can still be sent on their own.
+    """
+    marks: Dict[str, Any] = {}
+    for k in PERSISTED:
+        value = state[k]
+        marks[k] = (len(value), _digest(_items(value))) if isinstance(value, (list, dict)) else _digest(value)
+    return marks
+
+
+def diff(old: Dict[str, Any], new: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, List[Any]]]:
+    """``($set, $push)`` turning the snapshot fingerprinted as ``old`` into ``new``.
+
+    Appended answers are pushed and new perms set key by key; any other
+    change rewrites the whole field.
+    """
+    set_fields: Dict[str, Any] = {}
+    push_fields: Dict[str, List[Any]] = {}
+    for k in PERSISTED:
+        before, after = old.get(k), new[k]
+        if isinstance(before, tuple) and isinstance(after, (list, dict)):
+            count, digest = before
+            items = _items(after)
+            if len(items) >= count and _digest(items[:count]) == digest:
+                added = items[count:]
+                if not added:
+                    continue
+                if k == "answers":
+                    push_fields[k] = added
+                    continue
+                if isinstance(after, dict):
+                    for key, value in added:
+                        set_fields[f"{k}.{key}"] = value
+                    continue
+        elif before is not None and before == _digest(after):
+            continue
+        set_fields[k] = after
+    return set_fields, push_fields
+
+class SessionBackend(ABC):
+    """Where quiz progress lives between reruns; every write is guarded by ``rev``."""
+
+    @abstractmethod
+    def load_active(self, email: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def create(self, state: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def update(self, attempt_id: str, rev: int, set_fields: Dict[str, Any], push_fields: Dict[str, List[Any]]) -> bool:
+        ...
+
+    @abstractmethod
+    def end(self, attempt_id: str, status: str) -> None:
+        ...
+
+
+class MongoSessionBackend(SessionBackend):
+    def load_active(self, email):
+        return get_active_quiz_session(email)
+
+    def create(self, state):
+        create_quiz_session(state)
+
+    def update(self, attempt_id, rev, set_fields, push_fields):
+        return update_quiz_session(attempt_id, rev, set_fields, push_fields)
+
+    def end(self, attempt_id, status):
+        end_quiz_session(attempt_id, status)
+
+
+class MemorySessionBackend(SessionBackend):
+    """Process-local backend with the same semantics, for tests and single-process runs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+
+    def load_active(self, email):
+        with self._lock:
+            for doc in self._sessions.values():
+                if doc["email"] == email and doc["status"] == "active":
+                    return copy.deepcopy(doc)
+        return None
+
+    def create(self, state):
+        with self._lock:
+            for doc in self._sessions.values():
+                if doc["email"] == state["email"] and doc["status"] == "active":
+                    doc["status"] = "abandoned"
+            self._sessions[state["attempt_id"]] = {**copy.deepcopy(state), "status": "active"}
+
+    def update(self, attempt_id, rev, set_fields, push_fields):
+        with self._lock:
+            doc = self._sessions.get(attempt_id)
+            if doc is None or doc["status"] != "active" or doc["rev"] != rev:
+                return False
+            for path, value in copy.deepcopy(set_fields).items():
+                field, _, key = path.partition(".")
+                if key:
+                    doc[field][key] = value
+                else:
+                    doc[field] = value
+            for field, values in copy.deepcopy(push_fields).items():
+                doc[field].extend(values)
+            doc["rev"] += 1
+            return True
+
+    def end(self, attempt_id, status):
+        with self._lock:
+            doc = self._sessions.get(attempt_id)
+            if doc is not None and doc["status"] == "active":
+                doc["status"] = status
+
+
+_BACKENDS = {"mongo": MongoSessionBackend, "memory": MemorySessionBackend}
+_backend: Optional[SessionBackend] = None
+
+
+def get_session_backend() -> SessionBackend:
+    global _backend
+    if _backend is None:
+        name = session_config()["backend"]
+        if name not in _BACKENDS:
+            raise ValueError(f"Unknown QUIZ_SESSION_BACKEND '{name}'")
+        _backend = _BACKENDS[name]()
+    return _backend
@@ -0,0 +1,223 @@
+import glob
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+from config import writer_config
+from instrumentation import register_gauges
+from mongo_storage import save_results
+
+
+class ResultWriter:
+    """Write-behind buffer for answer rows.
+
+    ``submit`` only appends to an in-memory queue. A background thread
+    flushes with ``insert_many`` once ``batch_size`` rows are waiting or
+    every ``flush_seconds``. Batches that can't reach Mongo are appended to
+    a local spool file and replayed after the next successful flush.
+
+    Each process spools to its own file (pid in the name), so one replay
+    can't delete rows another process just appended. Spools left by dead
+    processes are adopted on replay. A row rejected ``max_row_failures``
+    times for any reason other than being a duplicate moves to a
+    quarantine file instead of blocking the spool.
+    """
+
+    def __init__(self, batch_size: int, flush_seconds: float, spool_path: str, max_row_failures: int = 3, max_replay_backoff: float = 60.0):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.spool_base = spool_path
+        self.max_row_failures = max_row_failures
+        self.max_replay_backoff = max_replay_backoff
+        root, ext = os.path.splitext(spool_path)
+        self.spool_path = f"{root}.{os.getpid()}{ext}"
+        self.quarantine_path = f"{root}.quarantine.{os.getpid()}{ext}"
+        self._spool_name = re.compile(re.escape(os.path.basename(root)) + r"\.(\d+)" + re.escape(ext))
+        self._row_failures: Dict[Any, int] = {}
+        self._replay_backoff = 0.0
+        self._replay_after = 0.0
+        self._queue: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._flushed = 0
+        self._spooled = 0
+        self._quarantined = 0
+        self._failures = 0
+        self._last_flush_ms = 0.0
+
+    def submit(self, result: Dict[str, Any]) -> None:
+        with self._cond:
+            self._queue.append(result)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+                self._thread.start()
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self) -> None:
+        """Write everything queued so far before returning (or spool it)."""
+        with self._cond:
+            batch, self._queue = self._queue, []
+        self._write(batch)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_seconds)
+                batch, self._queue = self._queue, []
+            self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        with self._flush_lock:
+            started = time.perf_counter()
+            try:
+                save_results(batch)
+            except Exception as e:
+                self._failures += 1
+                print(f"⚠️ Result flush failed, spooling {len(batch)} row(s): {e}")
+                self._spool(batch)
+                return
+            self._last_flush_ms = (time.perf_counter() - started) * 1000
+            self._flushed += len(batch)
+            self._replay()
+
+    def _spool(self, batch: List[Dict[str, Any]]) -> None:
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            for result in batch:
+                f.write(json_util.dumps(result) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._spooled += len(batch)
+
+    def _adopt_orphans(self) -> None:
+        """Move spools of processes that no longer exist into this one's spool."""
+        root = os.path.splitext(self.spool_base)[0]
+        for path in glob.glob(f"{glob.escape(root)}.*"):
+            match = self._spool_name.fullmatch(os.path.basename(path))
+            if not match or path == self.spool_path or _pid_alive(int(match.group(1))):
+                continue
+            claimed = f"{path}.{os.getpid()}.adopting"
+            try:
+                # rename is atomic, so only one process adopts a given file
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            with open(claimed, encoding="utf-8") as src, open(self.spool_path, "a", encoding="utf-8") as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(claimed)
+            print(f"📥 Adopted result spool {path}")
+
+    def _quarantine(self, rows: List[Dict[str, Any]]) -> None:
+        with open(self.quarantine_path, "a", encoding="utf-8") as f:
+            for result in rows:
+                f.write(json_util.dumps(result) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._quarantined += len(rows)
+        print(f"🚫 Quarantined {len(rows)} result row(s) that keep failing to {self.quarantine_path}")
+
+    def _replay(self) -> None:
+        # Back off after a failed replay so each flush doesn't reread the spool under the lock
+        if time.monotonic() < self._replay_after:
+            return
+        self._adopt_orphans()
+        if not os.path.exists(self.spool_path) or os.path.getsize(self.spool_path) == 0:
+            return
+        with open(self.spool_path, encoding="utf-8") as f:
+            rows = [json_util.loads(line) for line in f if line.strip()]
+        failed: List[Dict[str, Any]] = []
+        rejected: List[Dict[str, Any]] = []
+        error: Optional[Exception] = None
+        for i in range(0, len(rows), self.batch_size):
+            batch = rows[i:i + self.batch_size]
+            try:
+                save_results(batch)
+            except BulkWriteError as e:
+                # Duplicates were already written; other write errors are the rows' own fault
+                error = e
+                bad = {err["index"] for err in e.details.get("writeErrors", []) if err.get("code") != 11000}
+                for j, row in enumerate(batch):
+                    if j not in bad:
+                        failed.append(row)
+                        continue
+                    count = self._row_failures.get(row["_id"], 0) + 1
+                    self._row_failures[row["_id"]] = count
+                    (rejected if count >= self.max_row_failures else failed).append(row)
+            except Exception as e:
+                error = e
+                failed.extend(batch)
+        if rejected:
+            self._quarantine(rejected)
+            for row in rejected:
+                self._row_failures.pop(row["_id"], None)
+        if error is not None:
+            # Keep what still needs a retry; rows already written are skipped as duplicates next time
+            tmp = f"{self.spool_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for result in failed:
+                    f.write(json_util.dumps(result) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.spool_path)
+            self._replay_backoff = min(self.max_replay_backoff, max(self.flush_seconds, self._replay_backoff * 2))
+            self._replay_after = time.monotonic() + self._replay_backoff
+            print(f"⚠️ Spool replay failed, {len(failed)} row(s) left, retrying in {self._replay_backoff:.0f}s: {error}")
+            return
+        os.remove(self.spool_path)
+        self._replay_backoff = 0.0
+        self._flushed += len(rows) - len(rejected)
+        print(f"✅ Replayed {len(rows) - len(rejected)} spooled result(s)")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            depth = len(self._queue)
+        spool_bytes = os.path.getsize(self.spool_path) if os.path.exists(self.spool_path) else 0
+        return {
+            "queue_depth": depth,
+            "flushed": self._flushed,
+            "spooled": self._spooled,
+            "quarantined": self._quarantined,
+            "failed_flushes": self._failures,
+            "last_flush_ms": round(self._last_flush_ms, 2),
+            "spool_bytes": spool_bytes,
+        }
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to someone else
+        return True
+    return True
+
+
+_writer: Optional[ResultWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_result_writer() -> ResultWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            cfg = writer_config()
+            _writer = ResultWriter(
+                cfg["batch_size"], cfg["flush_seconds"], cfg["spool_path"],
+                cfg["max_row_failures"], cfg["max_replay_backoff"],
+            )
+        return _writer
+
+
+register_gauges(lambda: {f"quizapp_result_writer_{k}": v for k, v in get_result_writer().metrics().items()})
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+EXPORT_FIELDS = (
+    "number", "question_id", "text", "is_correct", "score",
+    "user_answers", "correct_answers", "user_texts", "correct_texts",
+)
+
+
+class ReviewItem:
+    __slots__ = EXPORT_FIELDS
+
+    def __init__(self, **values: Any):
+        for field in EXPORT_FIELDS:
+            setattr(self, field, values[field])
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in EXPORT_FIELDS}
+
+
+class QuizReview:
+    """Everything the results page needs, built once when the quiz completes."""
+
+    def __init__(self, items: List[ReviewItem], score: int, total_points: int):
+        self.items = items
+        self.score = score
+        self.total_points = total_points
+        self.incorrect = [item for item in items if not item.is_correct]
+
+    @staticmethod
+    def page(items: Sequence[ReviewItem], page: int, page_size: int) -> Sequence[ReviewItem]:
+        start = (page - 1) * page_size
+        return items[start:start + page_size]
+
+    def iter_csv(self) -> Iterator[str]:
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(EXPORT_FIELDS)
+        for item in self.items:
+            writer.writerow([
+                "|".join(map(str, v)) if isinstance(v, (list, tuple)) else v
+                for v in (getattr(item, f) for f in EXPORT_FIELDS)
+            ])
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+    def iter_json(self) -> Iterator[str]:
+        yield "["
+        for i, item in enumerate(self.items):
+            yield ("," if i else "") + json.dumps(item.as_dict(), default=str)
+        yield "]"
+
+    def export(self, fmt: str) -> bytes:
+        """CSV or JSON of the attempt, generated row by row; nothing is kept between calls."""
+        rows = self.iter_csv() if fmt == "csv" else self.iter_json()
+        return "".join(rows).encode("utf-8")
+
+
+def build_review(questions: Sequence[Any], answers: Sequence[Tuple[int, Tuple[str, ...], int]], perms: Dict[int, bytes], score: int) -> QuizReview:
+    """``questions`` is indexed by quiz position, as are ``answers`` and ``perms``."""
+    items = []
+    for index, user, gained in answers:
+        q = questions[index]
+        view = q.options_view(perms.get(index, b""))
+        correct = set(q.correct)
+        chosen = set(user)
+        items.append(ReviewItem(
+            number=index + 1,
+            question_id=q.id,
+            text=q.text,
+            is_correct=chosen == correct,
+            score=gained,
+            user_answers=list(user),
+            correct_answers=list(q.correct),
+            user_texts=[f"{label}. {text}" for label, key, text in view if key in chosen],
+            correct_texts=[f"{label}. {text}" for label, key, text in view if key in correct],
+        ))
+    total_points = sum(q.points for q in questions)
+    return QuizReview(items, score, total_points)
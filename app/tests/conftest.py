@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import db  # noqa: E402
+import mongo_storage  # noqa: E402
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """A fresh in-memory database behind the shared client, for one test."""
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(db, "get_client", lambda: client)
+    monkeypatch.setattr(mongo_storage, "_db", None)
+    mongo_storage._catalog.invalidate()
+    return mongo_storage._get_db()
+
+
+@pytest.fixture
+def app_dir(monkeypatch):
+    # main.py and auth read auth_config.yaml relative to the working directory
+    monkeypatch.chdir(APP_DIR)
+    return APP_DIR
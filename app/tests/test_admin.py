@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import auth
+from mongo_storage import create_user
+
+stauth = pytest.importorskip("streamlit_authenticator_mongo")
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+
+@pytest.fixture
+def admin_page(mongo, app_dir):
+    create_user("root@example.com", "Root", stauth.Hasher(["secret"]).generate()[0], "admin")
+    create_user("Carol@Example.com", "Carol", "hash", "user")
+    auth._store.invalidate()
+    at = AppTest.from_file(os.path.join(app_dir, "main.py"), default_timeout=30)
+    at.run()
+    at.text_input[0].input("root@example.com")
+    at.text_input[1].input("secret")
+    at.button[0].click().run()
+    next(r for r in at.sidebar.radio if r.label == "Go to").set_value("Admin").run()
+    return at
+
+
+def delete_user(at, email):
+    next(t for t in at.text_input if t.label == "Delete user by email").input(email)
+    next(b for b in at.button if b.label == "Delete User").click().run()
+    return at
+
+
+def test_delete_unknown_user_queues_nothing(admin_page, mongo):
+    at = delete_user(admin_page, "nobody@example.com")
+    assert not at.exception
+    assert [e.value for e in at.error] == ["No user with email 'nobody@example.com'."]
+    assert mongo.jobs.count_documents({"kind": "delete_user"}) == 0
+
+
+def test_delete_user_queues_the_stored_email(admin_page, mongo):
+    at = delete_user(admin_page, "CAROL@example.com")
+    assert not at.exception
+    job = mongo.jobs.find_one({"kind": "delete_user"})
+    assert job["params"] == {"email": "carol@example.com"}
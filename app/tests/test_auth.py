@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+import auth
+from mongo_storage import create_user, migrate_emails
+
+stauth = pytest.importorskip("streamlit_authenticator_mongo")
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+
+@pytest.fixture
+def alice(mongo, app_dir):
+    create_user("alice@example.com", "Alice", stauth.Hasher(["secret"]).generate()[0], "user")
+    auth._store.invalidate()
+    return os.path.join(app_dir, "main.py")
+
+
+def login(main_script, email, password):
+    at = AppTest.from_file(main_script, default_timeout=30)
+    at.run()
+    at.text_input[0].input(email)
+    at.text_input[1].input(password)
+    at.button[0].click().run()
+    return at
+
+
+def test_login_with_valid_credentials(alice):
+    at = login(alice, "alice@example.com", "secret")
+    assert not at.exception
+    assert [s.value for s in at.sidebar.success] == ["Welcome Alice (user)"]
+
+
+def test_login_email_is_case_insensitive(alice):
+    at = login(alice, "Alice@Example.com", "secret")
+    assert [s.value for s in at.sidebar.success] == ["Welcome Alice (user)"]
+
+
+def test_login_with_wrong_password(alice):
+    at = login(alice, "alice@example.com", "wrong")
+    assert [e.value for e in at.error] == ["Invalid credentials"]
+    assert not at.sidebar.success
+
+
+def test_migrated_mixed_case_account_can_log_in(mongo, app_dir):
+    # Written before emails were lowercased on the way in
+    mongo.users.insert_one({"email": "Kim@Example.com", "name": "Kim", "password": stauth.Hasher(["secret"]).generate()[0], "role": "user"})
+    main_script = os.path.join(app_dir, "main.py")
+    assert not login(main_script, "Kim@Example.com", "secret").sidebar.success
+    migrate_emails()
+    at = login(main_script, "Kim@Example.com", "secret")
+    assert [s.value for s in at.sidebar.success] == ["Welcome Kim (user)"]
+
+
+def test_get_user_doc_is_case_insensitive(mongo):
+    create_user("bob@example.com", "Bob", "hash", "admin")
+    auth._store.invalidate()
+    assert auth.get_user_doc("BOB@example.com")["role"] == "admin"
+    assert auth.get_user_doc("nobody@example.com") is None
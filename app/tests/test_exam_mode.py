@@ -0,0 +1,69 @@
+import pytest
+
+import exam_mode
+from question_cache import Question
+
+ARGS = ("attempt-1", "ana@example.com", [3, 1, 2], 1700000000.5)
+
+
+@pytest.fixture
+def secret(monkeypatch):
+    monkeypatch.setitem(exam_mode._cfg, "signing_secret", "exam-secret")
+
+
+def test_token_is_stable_and_names_its_attempt(secret):
+    token = exam_mode.exam_token(*ARGS)
+    assert token == exam_mode.exam_token(*ARGS)
+    assert token.startswith("attempt-1.")
+    assert exam_mode.verify_token(token, exam_mode.exam_token(*ARGS))
+
+
+@pytest.mark.parametrize("changed", [
+    ("attempt-2", "ana@example.com", [3, 1, 2], 1700000000.5),
+    ("attempt-1", "bob@example.com", [3, 1, 2], 1700000000.5),
+    ("attempt-1", "ana@example.com", [1, 2, 3], 1700000000.5),
+    ("attempt-1", "ana@example.com", [3, 1, 2], 1700000060.5),
+])
+def test_token_binds_attempt_user_questions_and_deadline(secret, changed):
+    assert not exam_mode.verify_token(exam_mode.exam_token(*changed), exam_mode.exam_token(*ARGS))
+
+
+def test_token_depends_on_the_secret(secret, monkeypatch):
+    token = exam_mode.exam_token(*ARGS)
+    monkeypatch.setitem(exam_mode._cfg, "signing_secret", "other-secret")
+    assert exam_mode.exam_token(*ARGS) != token
+
+
+def test_cookie_key_signs_when_no_secret_is_set(monkeypatch):
+    monkeypatch.setitem(exam_mode._cfg, "signing_secret", None)
+    monkeypatch.setattr(exam_mode, "cookie_signing_key", lambda: "cookie-key")
+    unset = exam_mode.exam_token(*ARGS)
+    monkeypatch.setitem(exam_mode._cfg, "signing_secret", "cookie-key")
+    assert exam_mode.exam_token(*ARGS) == unset
+
+
+@pytest.mark.parametrize("submitted", [None, 123, {"token": "x"}, "", "attempt-1.deadbeef"])
+def test_malformed_tokens_are_rejected(secret, submitted):
+    assert not exam_mode.verify_token(submitted, exam_mode.exam_token(*ARGS))
+
+
+def quiz():
+    single = Question(1, {"id": 1, "text": "One", "options": {"A": "a", "B": "b"}, "correct": ["A"], "type": "single", "points": 2})
+    multi = Question(2, {"id": 2, "text": "Two", "options": {"A": "a", "B": "b", "C": "c"}, "correct": ["A", "C"], "type": "multiple", "points": 1})
+    return [single, multi], {0: bytes([1, 0]), 1: bytes([2, 1, 0])}
+
+
+def test_payload_never_carries_answer_keys(secret):
+    questions, perms = quiz()
+    payload = exam_mode.build_payload(questions, perms, "token", 100.0)
+    assert [q["options"] for q in payload["questions"]] == [[["A", "b"], ["B", "a"]], [["A", "c"], ["B", "b"], ["C", "a"]]]
+    assert "correct" not in str(payload)
+
+
+def test_submission_is_scored_through_the_shuffle():
+    questions, perms = quiz()
+    submission = {"answers": {"0": ["B", "A"], "1": ["C", "A", "Z"]}, "elapsed": {"0": 9999, "1": -5, "2": 1}}
+    assert exam_mode.score_submission(questions, perms, submission, 300) == [
+        (0, ["A"], 2, 300.0),
+        (1, ["A", "C"], 1, 0.0),
+    ]
@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("pandas")
+
+import item_analysis  # noqa: E402
+import mongo_storage as ms  # noqa: E402
+
+
+def question(n, text="Question"):
+    return {"id": n, "text": f"{text} {n}", "options": {"A": "a", "B": "b"}, "correct": ["A"], "type": "single", "points": 1}
+
+
+def take_quiz(db, topic_id, version, answers):
+    """One finished attempt answering questions 1..n, old enough to be past the settle delay."""
+    attempt_id = ms.create_attempt("taker@example.com", topic_id, list(range(1, len(answers) + 1)), len(answers), 60, version=version)
+    rows = []
+    for qid, answer in enumerate(answers, start=1):
+        row = ms.build_result("taker@example.com", qid, [answer], ["A"], int(answer == "A"), topic_id, attempt_id, 2.0)
+        row["_id"] = ms.ObjectId()
+        rows.append(row)
+    ms.save_results(rows)
+    ms.finalize_attempt(attempt_id, 10)
+    doc = db.attempts.find_one({"attempt_id": attempt_id})
+    db.attempts.update_one({"attempt_id": attempt_id}, {"$set": {"finished_at": doc["finished_at"] - timedelta(minutes=10)}})
+
+
+@pytest.fixture
+def topic(mongo):
+    topic_id = ms.save_topic("Item Stats", [question(1), question(2)])
+    version = next(t["version"] for t in ms.get_all_topics() if t["topic_id"] == topic_id)
+    for answers in (["A", "A"], ["A", "B"], ["B", "B"]):
+        take_quiz(mongo, topic_id, version, answers)
+    return topic_id, version
+
+
+def fail_once(func):
+    """Wrap ``func`` so its first call dies the way a killed worker would."""
+    calls = []
+
+    def wrapper(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError("worker died")
+        return func(*args)
+
+    return wrapper
+
+
+def counts(topic_id, version):
+    return {d["question_id"]: (d["n"], d["n_correct"]) for d in ms.get_item_stats(topic_id, version)}
+
+
+def test_refresh_counts_each_attempt_once(topic):
+    topic_id, version = topic
+    assert item_analysis.refresh_item_stats(topic_id) == 2
+    assert counts(topic_id, version) == {1: (3, 2), 2: (3, 1)}
+    assert item_analysis.refresh_item_stats(topic_id) == 0
+    assert counts(topic_id, version) == {1: (3, 2), 2: (3, 1)}
+
+
+def test_failed_refresh_gets_its_window_back(topic, monkeypatch):
+    topic_id, version = topic
+
+    monkeypatch.setattr(item_analysis, "save_item_stats", fail_once(item_analysis.save_item_stats))
+    with pytest.raises(RuntimeError):
+        item_analysis.refresh_item_stats(topic_id)
+    assert item_analysis.refresh_item_stats(topic_id) == 2
+    assert counts(topic_id, version) == {1: (3, 2), 2: (3, 1)}
+
+
+def test_retry_after_save_does_not_count_twice(topic, monkeypatch):
+    topic_id, version = topic
+
+    monkeypatch.setattr(item_analysis, "commit_item_stats_window", fail_once(item_analysis.commit_item_stats_window))
+    with pytest.raises(RuntimeError):
+        item_analysis.refresh_item_stats(topic_id)
+    item_analysis.refresh_item_stats(topic_id)
+    assert counts(topic_id, version) == {1: (3, 2), 2: (3, 1)}
+    assert "pending" not in ms.get_item_stats_status(topic_id)
+
+
+def test_new_revision_starts_a_new_snapshot(topic, mongo):
+    topic_id, old_version = topic
+    item_analysis.refresh_item_stats(topic_id)
+    ms.save_topic("Item Stats", [question(1, "Reworded"), question(2, "Reworded")])
+    ms._catalog.invalidate()
+    version = next(t["version"] for t in ms.get_all_topics() if t["topic_id"] == topic_id)
+    take_quiz(mongo, topic_id, version, ["B", "A"])
+    item_analysis.refresh_item_stats(topic_id)
+    assert ms.get_item_stats_status(topic_id)["version"] == version
+    assert counts(topic_id, version) == {1: (1, 0), 2: (1, 1)}
+    assert counts(topic_id, old_version) == {}
+
+
+def test_item_stats_job_retried_after_failure(topic, mongo, monkeypatch):
+    import jobs
+
+    topic_id, version = topic
+    job_id = ms.enqueue_job("item_stats", {"topic_id": topic_id}, max_attempts=1)
+    mongo.jobs.update_one({"job_id": job_id}, {"$set": {"status": "running", "worker": "w1", "attempts": 1}})
+    monkeypatch.setattr(item_analysis, "commit_item_stats_window", fail_once(item_analysis.commit_item_stats_window))
+    jobs.run_job(ms.get_job(job_id), "w1")
+    assert ms.get_job(job_id)["status"] == "failed"
+
+    assert ms.retry_job(job_id)
+    mongo.jobs.update_one({"job_id": job_id}, {"$set": {"status": "running", "worker": "w2", "attempts": 1}})
+    jobs.run_job(ms.get_job(job_id), "w2")
+    assert ms.get_job(job_id)["status"] == "done"
+    assert counts(topic_id, version) == {1: (3, 2), 2: (3, 1)}
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import jobs
+import mongo_storage as ms
+
+
+def claim(db, worker):
+    """``claim_job``, reading the leased job back when mongomock drops the returned document."""
+    job = ms.claim_job(worker, 60)
+    return job or db.jobs.find_one({"worker": worker, "status": "running"}, {"_id": 0})
+
+
+def expire_lease(db, job_id):
+    db.jobs.update_one({"job_id": job_id}, {"$set": {"lease_until": datetime.utcnow() - timedelta(seconds=1)}})
+
+
+def test_same_key_queues_one_job(mongo):
+    first = jobs.enqueue("delete_topic", {"topic_id": "t"}, idempotency_key="delete_topic:t")
+    second = jobs.enqueue("delete_topic", {"topic_id": "t"}, idempotency_key="delete_topic:t")
+    assert first == second
+    assert mongo.jobs.count_documents({}) == 1
+
+
+def test_finished_job_releases_its_key(mongo):
+    first = jobs.enqueue("delete_topic", {"topic_id": "t"}, idempotency_key="delete_topic:t")
+    claim(mongo, "w1")
+    ms.complete_job(first, "w1", {"deleted": 0})
+    second = jobs.enqueue("delete_topic", {"topic_id": "t"}, idempotency_key="delete_topic:t")
+    assert second != first
+    assert ms.get_job(second)["status"] == "queued"
+
+
+def test_failed_job_releases_its_key(mongo):
+    first = ms.enqueue_job("delete_topic", {"topic_id": "t"}, "delete_topic:t", max_attempts=1)
+    claim(mongo, "w1")
+    assert ms.fail_job(first, "w1", "boom", 10) == "failed"
+    assert jobs.enqueue("delete_topic", {"topic_id": "t"}, idempotency_key="delete_topic:t") != first
+
+
+def test_leased_job_is_not_claimed_twice(mongo):
+    job_id = jobs.enqueue("delete_topic", {"topic_id": "t"})
+    assert claim(mongo, "w1")["job_id"] == job_id
+    assert claim(mongo, "w2") is None
+
+
+def test_expired_lease_is_taken_over(mongo):
+    job_id = jobs.enqueue("delete_topic", {"topic_id": "t"})
+    claim(mongo, "w1")
+    expire_lease(mongo, job_id)
+    job = claim(mongo, "w2")
+    assert job["job_id"] == job_id and job["attempts"] == 2
+    # The first worker finds out on its next progress report and stops
+    assert not ms.update_job_progress(job_id, "w1", 1, 2, "", 60)
+    assert ms.update_job_progress(job_id, "w2", 1, 2, "", 60)
+
+
+def test_lost_lease_leaves_the_job_to_its_new_worker(mongo, monkeypatch):
+    job_id = jobs.enqueue("delete_user", {"email": "gone@example.com"})
+    job = claim(mongo, "w1")
+    expire_lease(mongo, job_id)
+    claim(mongo, "w2")
+    monkeypatch.setattr(jobs, "delete_user_data", lambda email, progress: progress(1, 1) or {"users": 1})
+    jobs.run_job(job, "w1")
+    job = ms.get_job(job_id)
+    assert job["status"] == "running" and job["worker"] == "w2"
+
+
+def test_failed_attempt_is_requeued_with_backoff(mongo):
+    job_id = ms.enqueue_job("delete_topic", {"topic_id": "t"}, max_attempts=2)
+    claim(mongo, "w1")
+    assert ms.fail_job(job_id, "w1", "boom", 10) == "queued"
+    job = ms.get_job(job_id)
+    assert job["run_after"] > datetime.utcnow() + timedelta(seconds=5)
+    assert claim(mongo, "w2") is None
+
+
+def test_failed_job_can_be_retried(mongo):
+    job_id = ms.enqueue_job("delete_topic", {"topic_id": "t"}, max_attempts=1)
+    claim(mongo, "w1")
+    ms.fail_job(job_id, "w1", "boom", 10)
+    assert ms.retry_job(job_id)
+    job = claim(mongo, "w2")
+    assert job["job_id"] == job_id and job["attempts"] == 1
@@ -0,0 +1,52 @@
+import mongo_storage as ms
+
+
+def question(n, **extra):
+    return {"id": n, "text": f"Facet question {n}", "options": {"A": "a", "B": "b"}, "correct": ["A"], "type": "single", **extra}
+
+
+def version_of(topic_id):
+    return next(t["version"] for t in ms.get_all_topics() if t["topic_id"] == topic_id)
+
+
+def test_facets_of_questions_without_category_or_difficulty(mongo):
+    topic_id = ms.save_topic("Facets", [question(1), question(2, category="Algebra"), question(3, category="Algebra", difficulty="hard")])
+    assert ms.get_topic_facets(version_of(topic_id)) == [
+        {"category": "Algebra", "difficulty": None, "count": 1},
+        {"category": "Algebra", "difficulty": "hard", "count": 1},
+        {"category": None, "difficulty": None, "count": 1},
+    ]
+
+
+def test_users_are_stored_with_lowercased_email(mongo):
+    assert ms.create_user(" Eve@Example.com", "Eve", "hash", "user")
+    assert not ms.create_user("eve@example.com", "Eve again", "hash", "user")
+    assert ms.create_users([
+        {"email": "Frank@Example.com", "name": "Frank", "password": "hash", "role": "user"},
+        {"email": "EVE@example.com", "name": "Eve", "password": "hash", "role": "user"},
+    ]) == ["created", "duplicate"]
+    assert sorted(u["email"] for u in mongo.users.find()) == ["eve@example.com", "frank@example.com"]
+
+
+def test_update_user_by_mixed_case_email(mongo):
+    ms.create_user("grace@example.com", "Grace", "hash", "user")
+    assert ms.update_user("Grace@Example.com", {"role": "teacher"})
+    assert mongo.users.find_one({"email": "grace@example.com"})["role"] == "teacher"
+
+
+def test_find_users_email_prefix_ignores_case(mongo):
+    ms.create_user("Heidi@Example.com", "Heidi", "hash", "user")
+    users, _ = ms.find_users("HEIDI@")
+    assert [u["email"] for u in users] == ["heidi@example.com"]
+
+
+def test_migrate_emails_lowercases_and_reports_clashes(mongo):
+    ms._get_db()
+    mongo.users.insert_many([
+        {"email": "Ivan@Example.com", "name": "Ivan", "password": "hash"},
+        {"email": "judy@example.com", "name": "Judy", "password": "hash"},
+        {"email": "Judy@Example.com", "name": "Judy twin", "password": "hash"},
+    ])
+    assert ms.migrate_emails() == {"updated": 1, "conflicts": ["Judy@Example.com"]}
+    assert sorted(u["email"] for u in mongo.users.find()) == ["Judy@Example.com", "ivan@example.com", "judy@example.com"]
+    assert ms.migrate_emails() == {"updated": 0, "conflicts": ["Judy@Example.com"]}
@@ -0,0 +1,45 @@
+import io
+import json
+
+import pytest
+
+from question_import import iter_json_array
+
+QUESTIONS = [{"id": n, "text": f"Question {n}", "options": {"A": "a, b", "B": "]"}} for n in range(1, 6)] + [12345, "x"]
+
+
+def parse(text, chunk_size=64 * 1024):
+    return list(iter_json_array(io.BytesIO(text.encode("utf-8")), chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64 * 1024])
+def test_elements_split_across_chunks(chunk_size):
+    text = "\ufeff" + json.dumps(QUESTIONS, indent=2) + "\n"
+    assert parse(text, chunk_size) == QUESTIONS
+
+
+@pytest.mark.parametrize("text", ["[]", " [ ] \n", "[1]", "[ 1 , 2 ]"])
+def test_well_formed_arrays(text):
+    assert parse(text) == json.loads(text)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 64 * 1024])
+@pytest.mark.parametrize("text, message", [
+    ('[{"id": 1} {"id": 2}]', "Expected ',' or ']' after question 1."),
+    ("[1, 2 3]", "Expected ',' or ']' after question 2."),
+    ("[1, 2,]", "Expected a question after question 2 and ','."),
+    ("[1, 2] junk", "Unexpected content after the end of the question list."),
+    ("[1][2]", "Unexpected content after the end of the question list."),
+    ("[] ,", "Unexpected content after the end of the question list."),
+    ("[1, 2", "Unexpected end of file: the question list is not closed."),
+    ('{"id": 1}', "Root must be a list of questions."),
+])
+def test_malformed_arrays_are_rejected(text, message, chunk_size):
+    with pytest.raises(ValueError) as e:
+        parse(text, chunk_size)
+    assert str(e.value) == message
+
+
+def test_leading_comma_is_rejected():
+    with pytest.raises(ValueError):
+        parse("[, 1]")
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+import auth
+import mongo_storage as ms
+from question_cache import get_question_cache
+
+stauth = pytest.importorskip("streamlit_authenticator_mongo")
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+REMOVED = "This quiz's topic was removed, so the attempt has ended."
+
+
+def questions(prefix):
+    return [
+        {"id": n, "text": f"{prefix} {n}", "options": {"A": "a", "B": "b"}, "correct": ["A"], "type": "single", "points": 1}
+        for n in range(1, 4)
+    ]
+
+
+@pytest.fixture
+def main_script(mongo, app_dir):
+    ms.create_user("dana@example.com", "Dana", stauth.Hasher(["secret"]).generate()[0], "user")
+    auth._store.invalidate()
+    ms.save_topic("Kept", questions("Kept"))
+    get_question_cache().clear()
+    return os.path.join(app_dir, "main.py")
+
+
+def open_quiz(main_script):
+    at = AppTest.from_file(main_script, default_timeout=30)
+    at.run()
+    at.text_input[0].input("dana@example.com")
+    at.text_input[1].input("secret")
+    at.button[0].click().run()
+    next(r for r in at.sidebar.radio if r.label == "Go to").set_value("Quiz").run()
+    return at
+
+
+def start(at, topic_name):
+    next(s for s in at.sidebar.selectbox if s.label == "Topic").set_value(topic_name).run()
+    next(b for b in at.sidebar.button if b.label == "Start Quiz").click().run()
+    return at
+
+
+def remove_topic(topic_id):
+    ms.delete_topic(topic_id)
+    # Another replica deleted it, so nothing here has evicted the questions yet
+    get_question_cache().clear()
+
+
+def attempt_status(mongo):
+    return mongo.attempts.find_one({}, {"status": 1})["status"]
+
+
+def test_topic_removed_mid_quiz_ends_the_attempt(main_script, mongo):
+    topic_id = ms.save_topic("Doomed", questions("Doomed"))
+    at = start(open_quiz(main_script), "Doomed")
+    assert [r.label for r in at.main.radio] == ["Choose one:"]
+
+    remove_topic(topic_id)
+    at.run()
+    assert not at.exception
+    assert [e.value for e in at.error] == [REMOVED]
+    assert attempt_status(mongo) == "topic_removed"
+    assert ms.get_active_quiz_session("dana@example.com") is None
+
+
+def test_resumed_quiz_on_removed_topic_ends_once(main_script, mongo):
+    topic_id = ms.save_topic("Doomed", questions("Doomed"))
+    start(open_quiz(main_script), "Doomed")
+    remove_topic(topic_id)
+
+    at = open_quiz(main_script)
+    assert not at.exception
+    assert [e.value for e in at.error] == [REMOVED]
+    assert attempt_status(mongo) == "topic_removed"
+
+    at = open_quiz(main_script)
+    assert not at.exception
+    assert not at.error
+
+
+def test_finished_quiz_shows_its_review(main_script, mongo):
+    at = open_quiz(main_script)
+    next(s for s in at.sidebar.selectbox if s.label == "Topic").set_value("Kept").run()
+    next(n for n in at.sidebar.number_input if n.label == "Number of questions").set_value(1)
+    next(b for b in at.sidebar.button if b.label == "Start Quiz").click().run()
+    at.main.radio[0].set_value(at.main.radio[0].options[0])
+    next(b for b in at.button if b.label == "Submit Answer").click().run()
+    assert not at.exception
+    assert "Quiz complete!" in [s.value for s in at.main.success]
+    assert attempt_status(mongo) == "completed"
+    # The exports are built when a download button is clicked, not kept in the session
+    review = at.session_state["review"]
+    assert not any(isinstance(v, bytes) for v in vars(review).values())
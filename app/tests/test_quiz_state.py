@@ -0,0 +1,52 @@
+import copy
+import pickle
+
+from quiz_state import PERSISTED, MemorySessionBackend, diff, fingerprint
+
+
+def state(answers=0, perms=2):
+    return {
+        "quiz_topic_id": "topic", "quiz_version": "v1", "quiz_ordinals": [3, 1, 2], "index": answers, "score": answers,
+        "option_perms": {str(i): bytes([1, 0, 2, 3]) for i in range(perms)},
+        "answers": [[i, ["A"], 1] for i in range(answers)],
+        "start_time": 100.0, "end_time": 400.0, "training_mode": False, "exam_mode": False,
+    }
+
+
+def test_unchanged_state_writes_nothing():
+    assert diff(fingerprint(state(2)), state(2)) == ({}, {})
+
+
+def test_new_answers_are_pushed_and_new_perms_set_by_key():
+    set_fields, push_fields = diff(fingerprint(state(1, perms=1)), state(3, perms=2))
+    assert push_fields == {"answers": [[1, ["A"], 1], [2, ["A"], 1]]}
+    assert set_fields == {"index": 3, "score": 3, "option_perms.1": bytes([1, 0, 2, 3])}
+
+
+def test_rewritten_fields_are_set_whole():
+    new = state(2)
+    new["answers"][0] = [0, ["B"], 0]
+    new["option_perms"]["0"] = bytes([3, 2, 1, 0])
+    new["quiz_ordinals"] = [1, 2, 3]
+    set_fields, push_fields = diff(fingerprint(state(2)), new)
+    assert push_fields == {}
+    assert set_fields == {"answers": new["answers"], "option_perms": new["option_perms"], "quiz_ordinals": [1, 2, 3]}
+
+
+def test_fingerprint_does_not_grow_with_the_quiz():
+    small = len(pickle.dumps(fingerprint(state(1, perms=1))))
+    assert len(pickle.dumps(fingerprint(state(1000, perms=1000)))) <= small + 8
+    assert len(pickle.dumps(state(1000, perms=1000))) > 10 * small
+
+
+def test_saved_diffs_rebuild_the_snapshot():
+    sessions = MemorySessionBackend()
+    saved = state(0, perms=0)
+    sessions.create({**copy.deepcopy(saved), "attempt_id": "a1", "email": "e@example.com", "rev": 0})
+    persisted, rev = fingerprint(saved), 0
+    for n in range(1, 6):
+        new = state(n, perms=n)
+        assert sessions.update("a1", rev, *diff(persisted, new))
+        persisted, rev = fingerprint(new), rev + 1
+    doc = sessions.load_active("e@example.com")
+    assert {k: doc[k] for k in PERSISTED} == state(5, perms=5)
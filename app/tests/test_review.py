@@ -0,0 +1,31 @@
+import csv
+import io
+import json
+
+from question_cache import Question
+from review import EXPORT_FIELDS, build_review
+
+
+def review():
+    questions = [
+        Question(n, {"id": n, "text": f"Question {n}", "options": {"A": "a", "B": "b"}, "correct": ["A"], "type": "single", "points": 1})
+        for n in (1, 2)
+    ]
+    answers = [(0, ("A",), 1), (1, ("B",), 0)]
+    return build_review(questions, answers, {0: bytes([0, 1]), 1: bytes([1, 0])}, 1)
+
+
+def test_exports():
+    r = review()
+    rows = list(csv.DictReader(io.StringIO(r.export("csv").decode("utf-8"))))
+    assert [(row["question_id"], row["is_correct"], row["user_answers"]) for row in rows] == [("1", "True", "A"), ("2", "False", "B")]
+    items = json.loads(r.export("json"))
+    assert [list(item) for item in items] == [list(EXPORT_FIELDS)] * 2
+    assert items[1]["correct_texts"] == ["B. a"]
+
+
+def test_exports_are_not_kept_on_the_review():
+    r = review()
+    r.export("csv")
+    r.export("json")
+    assert not any(isinstance(v, (bytes, dict)) for v in vars(r).values())
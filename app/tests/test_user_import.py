@@ -0,0 +1,22 @@
+import sys
+import types
+
+import bcrypt
+
+from user_import import provision_users
+
+
+def test_provision_users_in_spawned_workers(mongo, monkeypatch):
+    # Spawned workers re-run __main__, which is main.py after an AppTest in this process
+    monkeypatch.setitem(sys.modules, "__main__", types.ModuleType("__main__"))
+    rows = [
+        {"email": "Leo@Example.com", "name": "Leo", "password": "pw-leo", "role": ""},
+        {"email": "mia@example.com", "name": "Mia", "password": "pw-mia", "role": "teacher"},
+        {"email": "leo@example.com", "name": "Leo again", "password": "pw", "role": "user"},
+        {"email": "no-at-sign", "name": "Nobody", "password": "pw", "role": "user"},
+    ]
+    report = provision_users(rows, processes=2)
+    assert [(r["row"], r["status"]) for r in report] == [(1, "created"), (2, "created"), (3, "invalid"), (4, "invalid")]
+    leo = mongo.users.find_one({"email": "leo@example.com"})
+    assert leo["role"] == "user"
+    assert bcrypt.checkpw(b"pw-leo", leo["password"].encode())
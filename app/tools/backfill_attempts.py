@@ -0,0 +1,14 @@
+"""Group legacy per-question results into quiz attempts.
+
+Run from app/:  python -m tools.backfill_attempts [--gap-minutes 30]
+"""
+import argparse
+
+from mongo_storage import backfill_attempts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--gap-minutes", type=int, default=30)
+    args = parser.parse_args()
+    created = backfill_attempts(args.gap_minutes)
+    print(f"✅ Created {created} attempt(s) from existing results")
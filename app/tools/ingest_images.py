@@ -0,0 +1,17 @@
+"""Fetch images for already-imported questions into the content-addressed store.
+
+Run from app/:  python -m tools.ingest_images
+"""
+from image_store import ingest_image
+from mongo_storage import iter_questions_without_image_hash, set_question_image_hash
+
+if __name__ == "__main__":
+    done = failed = 0
+    for q in iter_questions_without_image_hash():
+        image_hash = ingest_image(q["image"])
+        if image_hash:
+            set_question_image_hash(q["topic_id"], q["ordinal"], image_hash)
+            done += 1
+        else:
+            failed += 1
+    print(f"✅ Stored {done} image(s), {failed} could not be fetched")
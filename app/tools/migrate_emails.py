@@ -0,0 +1,11 @@
+"""Lowercase stored user emails; accounts with mixed-case emails can't log in.
+
+Run from app/:  python -m tools.migrate_emails
+"""
+from mongo_storage import migrate_emails
+
+if __name__ == "__main__":
+    report = migrate_emails()
+    print(f"✅ Lowercased {report['updated']} email(s)")
+    for email in report["conflicts"]:
+        print(f"⚠️ {email}: another account already has this email lowercased; merge or delete one of them")
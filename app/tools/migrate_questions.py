@@ -0,0 +1,9 @@
+"""Move embedded topic questions into the indexed questions collection.
+
+Run from app/:  python -m tools.migrate_questions
+"""
+from mongo_storage import migrate_embedded_questions
+
+if __name__ == "__main__":
+    migrated = migrate_embedded_questions()
+    print(f"✅ Migrated {migrated} topic(s) to the questions collection")
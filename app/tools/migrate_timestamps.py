@@ -0,0 +1,14 @@
+"""Convert stored ISO-string timestamps into BSON dates.
+
+Run from app/:  python -m tools.migrate_timestamps [--batch-size 1000]
+"""
+import argparse
+
+from mongo_storage import migrate_timestamps
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    for field, count in migrate_timestamps(args.batch_size).items():
+        print(f"✅ {field}: converted {count} document(s)")
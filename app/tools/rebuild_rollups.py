@@ -0,0 +1,14 @@
+"""Regenerate the dashboard's daily rollups from raw results.
+
+Run from app/:  python -m tools.rebuild_rollups [--email someone@example.com]
+"""
+import argparse
+
+from mongo_storage import rebuild_daily_rollups
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--email", default=None, help="Only rebuild this user's rollups")
+    args = parser.parse_args()
+    count = rebuild_daily_rollups(args.email)
+    print(f"✅ Rebuilt {count} daily rollup(s)")
@@ -0,0 +1,18 @@
+"""Fold new results into the per-question item statistics snapshot.
+
+Run from app/ (e.g. from cron):  python -m tools.refresh_item_stats [--topic-id ID] [--rebuild]
+"""
+import argparse
+
+from item_analysis import refresh_item_stats
+from mongo_storage import get_all_topics
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topic-id", default=None, help="Only refresh this topic")
+    parser.add_argument("--rebuild", action="store_true", help="Discard the snapshot and recompute from all results")
+    args = parser.parse_args()
+    topic_ids = [args.topic_id] if args.topic_id else [t["topic_id"] for t in get_all_topics()]
+    for topic_id in topic_ids:
+        count = refresh_item_stats(topic_id, rebuild=args.rebuild)
+        print(f"✅ {topic_id}: {count} question(s) updated")
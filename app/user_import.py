@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+from mongo_storage import create_users
+
+ROLES = ("admin", "user", "teacher")
+FIELDS = ("email", "name", "password", "role")
+
+
+def parse_users(stream: BinaryIO, filename: str) -> List[Dict[str, Any]]:
+    """Rows from a CSV (with a header) or a JSON array of objects with FIELDS."""
+    raw = stream.read()
+    text = raw.decode("utf-8-sig") if isinstance(raw, bytes) else raw
+    if filename.lower().endswith(".json"):
+        rows = json.loads(text)
+        if not isinstance(rows, list):
+            raise ValueError("Root must be a list of users.")
+    else:
+        rows = list(csv.DictReader(io.StringIO(text)))
+    return [{f: str(r.get(f) or "").strip() for f in FIELDS} if isinstance(r, dict) else {} for r in rows]
+
+
+def row_issue(row: Dict[str, Any], seen: set) -> Optional[str]:
+    if not row:
+        return "Row is not an object."
+    missing = [f for f in ("email", "name", "password") if not row.get(f)]
+    if missing:
+        return f"Missing {', '.join(missing)}."
+    if "@" not in row["email"]:
+        return "Invalid email."
+    if (row.get("role") or "user") not in ROLES:
+        return f"Role must be one of {', '.join(ROLES)}."
+    if row["email"].lower() in seen:
+        return "Email repeated in this file."
+    return None
+
+
+def _hash_chunk(passwords: List[str]) -> List[str]:
+    # Runs in a worker process; same hash format as the single-user form
+    import streamlit_authenticator_mongo as stauth
+
+    return stauth.Hasher(passwords).generate()
+
+
+def hash_passwords(passwords: List[str], pool: Optional[ProcessPoolExecutor] = None, chunk_size: int = 16) -> List[str]:
+    """bcrypt every password, spread over ``pool`` when given."""
+    chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+    hashed: List[str] = []
+    for part in (pool.map(_hash_chunk, chunks) if pool else map(_hash_chunk, chunks)):
+        hashed += part
+    return hashed
+
+
+def provision_users(
+    rows: List[Dict[str, Any]],
+    processes: Optional[int] = None,
+    batch_size: int = 500,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> List[Dict[str, Any]]:
+    """Hash in a process pool and insert in unordered batches.
+
+    Returns one ``{row, email, status, detail}`` entry per input row, where
+    status is "created", "duplicate", "invalid" or "error".
+    """
+    report: List[Dict[str, Any]] = []
+    valid = []
+    seen: set = set()
+    for i, row in enumerate(rows, start=1):
+        issue = row_issue(row, seen)
+        if issue:
+            report.append({"row": i, "email": row.get("email", ""), "status": "invalid", "detail": issue})
+        else:
+            seen.add(row["email"].lower())
+            valid.append((i, row))
+
+    # spawn, so no worker inherits a MongoClient or a held lock from the job process
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), mp_context=multiprocessing.get_context("spawn")) as pool:
+        for start in range(0, len(valid), batch_size):
+            batch = valid[start:start + batch_size]
+            hashed = hash_passwords([row["password"] for _, row in batch], pool)
+            docs = [
+                {"email": row["email"], "name": row["name"], "password": pw, "role": row.get("role") or "user"}
+                for (_, row), pw in zip(batch, hashed)
+            ]
+            for (i, row), status in zip(batch, create_users(docs)):
+                kind = status if status in ("created", "duplicate") else "error"
+                detail = "" if kind == "created" else ("Email already registered." if kind == "duplicate" else status)
+                report.append({"row": i, "email": row["email"], "status": kind, "detail": detail})
+            if progress:
+                progress(start + len(batch), len(valid))
+
+    report.sort(key=lambda r: r["row"])
+    return report
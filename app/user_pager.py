@@ -0,0 +1,28 @@
+import streamlit as st
+from typing import Any, Dict, List
+from mongo_storage import find_users
+
+
+def paged_users(key: str, page_size: int = 25) -> List[Dict[str, Any]]:
+    """Search box plus prev/next paging over users; only one page is fetched per rerun."""
+    search = st.text_input("Search users by email or name", key=f"{key}_search").strip()
+    cursors_key = f"{key}_cursors"
+    if st.session_state.get(f"{key}_last_search") != search:
+        st.session_state[f"{key}_last_search"] = search
+        st.session_state[cursors_key] = [None]
+    cursors = st.session_state.setdefault(cursors_key, [None])
+
+    users, next_cursor = find_users(search, after=cursors[-1], limit=page_size)
+
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        if st.button("◀ Prev", key=f"{key}_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if st.button("Next ▶", key=f"{key}_next", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+    with col3:
+        st.caption(f"Page {len(cursors)}")
+    return users
@@ -0,0 +1,113 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# A rule takes a question dict and returns None, a message, or a list of them
+Rule = Callable[[Dict[str, Any]], Any]
+
+REQUIRED_FIELDS = ("id", "text", "options", "correct", "type", "points")
+
+
+class TooManyIssues(Exception):
+    pass
+
+
+def valid_id(qid: Any) -> bool:
+    # bool is an int subclass, and True == 1 would pass as a duplicate of id 1
+    return isinstance(qid, (str, int)) and not isinstance(qid, bool)
+
+
+# -------- Rules --------
+
+def check_fields(q: Dict[str, Any]) -> List[str]:
+    """Required fields and field types."""
+    issues = []
+    for field in REQUIRED_FIELDS:
+        if field not in q:
+            issues.append(f"missing '{field}'.")
+    if "id" in q and not valid_id(q["id"]):
+        issues.append("'id' must be a string or integer.")
+    if "options" in q and not isinstance(q["options"], dict):
+        issues.append("'options' must be an object.")
+    if "correct" in q and not isinstance(q["correct"], list):
+        issues.append("'correct' must be a list of labels.")
+    if "image" in q and q["image"] and not isinstance(q["image"], str):
+        issues.append("'image' must be a string URL if present.")
+    if "category" in q and q["category"] and not isinstance(q["category"], str):
+        issues.append("'category' must be a string if present.")
+    if "difficulty" in q and q["difficulty"] and not isinstance(q["difficulty"], str):
+        issues.append("'difficulty' must be a string if present.")
+    return issues
+
+
+def check_answers(q: Dict[str, Any]) -> Optional[List[str]]:
+    options, correct = q.get("options"), q.get("correct")
+    if not isinstance(options, dict) or not isinstance(correct, list):
+        return None
+    if len(correct) == 1 and isinstance(correct[0], str) and correct[0] in options:
+        return None
+    issues = []
+    unknown = [c for c in correct if not isinstance(c, str) or c not in options]
+    if unknown:
+        issues.append(f"'correct' label(s) {unknown} not found in 'options'.")
+    if len(correct) != 1 and q.get("type") == "single":
+        issues.append(f"'single' question must have exactly one correct answer, found {len(correct)}.")
+    return issues or None
+
+
+DEFAULT_RULES: Sequence[Rule] = (check_fields, check_answers)
+
+
+# -------- Engine --------
+
+class ValidationEngine:
+    """Validates a question bank against a sequence of rules.
+
+    Cross-question checks (duplicate ids) use an id index built as questions
+    are fed in. Checking stops once ``max_issues`` problems were found.
+    """
+
+    def __init__(self, max_issues: Optional[int] = 100, rules: Sequence[Rule] = DEFAULT_RULES):
+        self.max_issues = max_issues
+        self.rules = rules
+        self.reset()
+
+    def reset(self) -> None:
+        self.issues: List[str] = []
+        self._seen_ids: Dict[Any, int] = {}
+
+    @property
+    def full(self) -> bool:
+        return self.max_issues is not None and len(self.issues) >= self.max_issues
+
+    def _add(self, issue: str) -> None:
+        self.issues.append(issue)
+        if self.full:
+            raise TooManyIssues()
+
+    def feed(self, i: int, q: Any) -> bool:
+        """Check one question; returns False once the issue cap is reached."""
+        try:
+            if not isinstance(q, dict):
+                self._add(f"Q{i}: must be an object.")
+                return True
+            for rule in self.rules:
+                found = rule(q)
+                if found:
+                    for msg in [found] if isinstance(found, str) else found:
+                        self._add(f"Q{i}: {msg}")
+            qid = q.get("id")
+            if valid_id(qid):
+                first = self._seen_ids.setdefault(qid, i)
+                if first != i:
+                    self._add(f"Q{i}: duplicate id {qid!r} (first used by Q{first}).")
+        except TooManyIssues:
+            return False
+        return True
+
+    def validate(self, questions: Any) -> List[str]:
+        self.reset()
+        if not isinstance(questions, list):
+            return ["Root must be a list of questions."]
+        for i, q in enumerate(questions, start=1):
+            if not self.feed(i, q):
+                break
+        return self.issues